@@ -0,0 +1,100 @@
+import math
+import random
+import time
+from array import array
+from GeometricAux import *
+from Parallel import slabBoundaries, slabBlock, countSlab
+
+
+def normalQuantile(probability):
+    """
+        returns z with P(Z <= z) = probability for a standard normal Z, by bisection of its erf form
+    """
+    (low, high) = (-10.0, 10.0)
+    for _ in range(100):
+        middle = (low + high) / 2
+        if (1 + math.erf(middle / math.sqrt(2))) / 2 < probability:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+class ApproximateCount(object):
+    """
+        Estimates the number of intersection points of inputs too dense to count exactly in time: the x axis
+        is split into numOfSlabs vertical slabs at end-point quantiles (as Parallel.countBySlabs does), a
+        random sample of the slabs is swept exactly (see LineSweep xRange) and the total is extrapolated
+        from their mean. The slab counts are exact, so the only error is the sampling error, bounded by a
+        normal confidence interval with the finite population correction.
+        Slabs are swept in random order until the half width of the interval is at most relativeError of
+        the estimate, or timeBudget seconds have passed; once every slab is swept the count is exact
+    """
+
+    def __init__(self, segmentsSet, relativeError=0.05, timeBudget=None, confidence=0.95, numOfSlabs=400,
+                 minSlabs=8, seed=0):
+        """
+            relativeError- the target half width of the confidence interval, relative to the estimate
+            timeBudget- if given, the seconds after which sampling stops, whatever the error
+            confidence- the confidence level of the interval
+            minSlabs- the number of slabs swept before the interval is trusted
+        """
+        self.coordinates = array('d')
+        for seg in segmentsSet:
+            self.coordinates.extend((seg.startPoint.x, seg.startPoint.y, seg.endPoint.x, seg.endPoint.y))
+        self.relativeError = relativeError
+        self.timeBudget = timeBudget
+        self.z = normalQuantile((1 + confidence) / 2)
+        self.minSlabs = minSlabs
+        boundaries = slabBoundaries(self.coordinates, numOfSlabs) if self.coordinates else []
+        self.slabs = list(zip([None] + boundaries, boundaries + [None]))
+        self.rng = random.Random(seed)
+        self.counts = []
+        self.estimate = 0.0
+        self.halfWidth = 0.0
+
+    def update(self):
+        """
+            recomputes the estimate and the half width of its interval from the counts of the swept slabs
+        """
+        (numOfSlabs, sampled) = (len(self.slabs), len(self.counts))
+        mean = sum(self.counts) / sampled
+        self.estimate = numOfSlabs * mean
+        if sampled == numOfSlabs:
+            self.halfWidth = 0.0
+        elif sampled < 2:
+            self.halfWidth = math.inf
+        else:
+            variance = sum((count - mean) ** 2 for count in self.counts) / (sampled - 1)
+            self.halfWidth = self.z * numOfSlabs * math.sqrt((1 - sampled / numOfSlabs) * variance / sampled)
+
+    def run(self):
+        start = time.perf_counter()
+        values = self.coordinates.tolist()
+        order = list(range(len(self.slabs)))
+        self.rng.shuffle(order)
+        for slab in order:
+            (fromX, toX) = self.slabs[slab]
+            self.counts.append(countSlab(slabBlock(values, fromX, toX), fromX, toX))
+            self.update()
+            if len(self.counts) >= self.minSlabs and self.halfWidth <= self.relativeError * self.estimate and \
+                    self.estimate > 0:
+                break
+            if self.timeBudget is not None and time.perf_counter() - start >= self.timeBudget:
+                break
+        return self
+
+    def isExact(self):
+        return len(self.counts) == len(self.slabs)
+
+    def getResult(self):
+        """
+            returns the estimated number of intersection points, rounded
+        """
+        return int(round(self.estimate))
+
+    def getInterval(self):
+        """
+            returns the confidence interval (low, high) of the number of intersection points
+        """
+        return max(0.0, self.estimate - self.halfWidth), self.estimate + self.halfWidth
@@ -12,12 +12,17 @@ https://ocw.mit.edu/courses/electrical-engineering-and-computer-science/6-006-in
 
 https://ocw.mit.edu/courses/electrical-engineering-and-computer-science/6-006-introduction-to-algorithms-fall-2011/lecture-videos/lecture-6-avl-trees-avl-sort/
 
+Made iterative (no recursion on find/insert/delete), with __slots__ nodes that are
+recycled through a free list of the tree.
+
 """
 
 
 class AVLNode(object):
     """A node in the AVL tree."""
 
+    __slots__ = ('key', 'parent', 'left', 'right', 'height')
+
     def __init__(self, parent, k):
         """Creates a node.
 
@@ -29,6 +34,7 @@ class AVLNode(object):
         self.parent = parent
         self.left = None
         self.right = None
+        self.height = 0
 
     def _str(self):
         """Internal method for ASCII art."""
@@ -74,18 +80,16 @@ class AVLNode(object):
         Returns:
             The node with key k.
         """
-        if k == self.key:
-            return self
-        elif k < self.key:
-            if self.left is None:
-                return None
-            else:
-                return self.left.find(k)
-        else:
-            if self.right is None:
-                return None
+        current = self
+        while current is not None:
+            key = current.key
+            if k == key:
+                return current
+            elif k < key:
+                current = current.left
             else:
-                return self.right.find(k)
+                current = current.right
+        return None
 
     def find_min(self):
         """Finds the node with the minimum key in the subtree rooted at this
@@ -109,21 +113,31 @@ class AVLNode(object):
     def next_larger(self):
         """Returns the node with the next larger key (the successor) in the BST.
         """
-        if self.right is not None:
-            return self.right.find_min()
+        current = self.right
+        if current is not None:
+            while current.left is not None:
+                current = current.left
+            return current
         current = self
-        while current.parent is not None and current is current.parent.right:
-            current = current.parent
-        return current.parent
+        parent = current.parent
+        while parent is not None and current is parent.right:
+            current = parent
+            parent = current.parent
+        return parent
 
     def prev_smaller(self):
         """Returns the predecessor node """
-        if self.left is not None:
-            return self.left.find_max()
+        current = self.left
+        if current is not None:
+            while current.right is not None:
+                current = current.right
+            return current
         current = self
-        while current.parent is not None and current is current.parent.left:
-            current = current.parent
-        return current.parent
+        parent = current.parent
+        while parent is not None and current is parent.left:
+            current = parent
+            parent = current.parent
+        return parent
 
     def insert(self, node):
         """Inserts a node into the subtree rooted at this node.
@@ -133,35 +147,44 @@ class AVLNode(object):
         """
         if node is None:
             return
-        if node.key < self.key:
-            if self.left is None:
-                node.parent = self
-                self.left = node
-            else:
-                self.left.insert(node)
-        else:
-            if self.right is None:
-                node.parent = self
-                self.right = node
+        k = node.key
+        current = self
+        while True:
+            if k < current.key:
+                if current.left is None:
+                    current.left = node
+                    break
+                current = current.left
             else:
-                self.right.insert(node)
+                if current.right is None:
+                    current.right = node
+                    break
+                current = current.right
+        node.parent = current
 
     def delete(self):
-        """Deletes and returns this node from the tree."""
-        if self.left is None or self.right is None:
-            if self is self.parent.left:
-                self.parent.left = self.left or self.right
-                if self.parent.left is not None:
-                    self.parent.left.parent = self.parent
+        """Unlinks a node with at most one child from the tree, or exchanges the
+        key with the successor and unlinks the successor's node.
+
+        Returns:
+            The node unlinked from the tree. Its parent is the first node that
+            may be out of balance. If it was the root, its parent is None and
+            the caller has to set the new root (its only child, if any).
+        """
+        node = self
+        if node.left is not None and node.right is not None:
+            node = node.next_larger()
+            self.key, node.key = node.key, self.key
+        child = node.left or node.right
+        parent = node.parent
+        if child is not None:
+            child.parent = parent
+        if parent is not None:
+            if node is parent.left:
+                parent.left = child
             else:
-                self.parent.right = self.left or self.right
-                if self.parent.right is not None:
-                    self.parent.right.parent = self.parent
-            return self
-        else:
-            s = self.next_larger()
-            self.key, s.key = s.key, self.key
-            return s.delete()
+                parent.right = child
+        return node
 
 
 def height(node):
@@ -183,6 +206,8 @@ class AVL(object):
     def __init__(self):
         """ empty tree """
         self.root = None
+        # deleted nodes, reused by the following inserts
+        self.free_nodes = []
 
     def __str__(self):
         if self.root is None: return '<empty tree>'
@@ -259,20 +284,34 @@ class AVL(object):
         update_height(y)
 
     def rebalance(self, node):
+        """Restores the balance property on the path from node up to the root.
+        Stops as soon as a node is balanced and its height did not change,
+        since nothing above it changed either.
+        """
         while node is not None:
-            update_height(node)
-            if height(node.left) >= 2 + height(node.right):
-                if height(node.left.left) >= height(node.left.right):
+            left = node.left
+            right = node.right
+            left_height = -1 if left is None else left.height
+            right_height = -1 if right is None else right.height
+            if left_height >= 2 + right_height:
+                if height(left.left) >= height(left.right):
                     self.right_rotate(node)
                 else:
-                    self.left_rotate(node.left)
+                    self.left_rotate(left)
                     self.right_rotate(node)
-            elif height(node.right) >= 2 + height(node.left):
-                if height(node.right.right) >= height(node.right.left):
+                node = node.parent
+            elif right_height >= 2 + left_height:
+                if height(right.right) >= height(right.left):
                     self.left_rotate(node)
                 else:
-                    self.right_rotate(node.right)
+                    self.right_rotate(right)
                     self.left_rotate(node)
+                node = node.parent
+            else:
+                new_height = (left_height if left_height > right_height else right_height) + 1
+                if new_height == node.height and node.height != 0:
+                    return
+                node.height = new_height
             node = node.parent
 
     def insert(self, k):
@@ -281,14 +320,22 @@ class AVL(object):
 
         Args:
             k: The key of the node to be inserted.
+
+        Returns:
+            The node holding k, which can be used as a handle for delete_node.
         """
-        node = AVLNode(None, k)
+        if self.free_nodes:
+            node = self.free_nodes.pop()
+            node.key = k
+        else:
+            node = AVLNode(None, k)
         if self.root is None:
             # The root's parent is None.
             self.root = node
         else:
             self.root.insert(node)
         self.rebalance(node)
+        return node
 
     def delete(self, k):
         """Deletes and returns a node with key k if it exists from the BST.
@@ -303,19 +350,32 @@ class AVL(object):
         node = self.find(k)
         if node is None:
             return None
-        if node is self.root:
-            pseudoroot = AVLNode(None, 0)
-            pseudoroot.left = self.root
-            self.root.parent = pseudoroot
-            deleted = self.root.delete()
-            self.root = pseudoroot.left
-            if self.root is not None:
-                self.root.parent = None
-        else:
-            deleted = node.delete()
-            ## node.parent is actually the old parent of the node,
+        return self.delete_node(node)
+
+    def delete_node(self, node):
+        """Deletes a node that is known to be in the tree, without searching for it.
+        When the node has two children its key is exchanged with its successor's
+        key, so the node object may stay in the tree holding the successor key.
+
+        Args:
+            node: A node previously returned by insert.
+
+        Returns:
+            The node object that was actually unlinked from the tree. It is kept
+            for reuse by the following inserts, so only its identity is meaningful.
+        """
+        deleted = node.delete()
+        parent = deleted.parent
+        if parent is None:
+            self.root = deleted.left or deleted.right
+        ## parent is the old parent of the unlinked node,
         ## which is the first potentially out-of-balance node.
-        self.rebalance(deleted.parent)
+        self.rebalance(parent)
+
+        deleted.key = deleted.parent = deleted.left = deleted.right = None
+        deleted.height = 0
+        self.free_nodes.append(deleted)
+        return deleted
 
 
 def test(args=None):
@@ -0,0 +1,106 @@
+"""
+
+Micro-benchmark of the AVL tree: insertions, lookups and delete/insert churn
+(the access pattern of the line status) on random keys.
+
+usage: python Benchmark.py [--n N] [--repeat R] [--against path/to/other/AVL.py]
+
+With --against, the same workload also runs on the AVL class of the given file
+(for example an older revision taken with git show <rev>:Avl/AVL.py) and both
+timings are printed.
+
+"""
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import time
+
+
+class Key(object):
+    """An int wrapper compared by Python level operators, like the segments in the line status."""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return self.value < other.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def load_avl(path):
+    spec = importlib.util.spec_from_file_location('avl_' + str(abs(hash(path))), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.AVL
+
+
+def workload(avl_class, keys, churn):
+    tree = avl_class()
+    timings = {}
+
+    start = time.perf_counter()
+    for k in keys:
+        tree.insert(k)
+    timings['insert'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for k in keys:
+        tree.find(k)
+    timings['find'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for k in churn:
+        tree.delete(k)
+        tree.insert(k)
+    timings['delete+insert'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for k in keys:
+        tree.next_larger(k)
+        tree.prev_smaller(k)
+    timings['neighbors'] = time.perf_counter() - start
+    return timings
+
+
+def best_of(avl_class, keys, churn, repeat):
+    best = {}
+    for _ in range(repeat):
+        for op, seconds in workload(avl_class, keys, churn).items():
+            best[op] = min(best.get(op, seconds), seconds)
+    return best
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='AVL micro-benchmark')
+    parser.add_argument('--n', type=int, default=100000, help='number of keys')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per tree, the best one is reported')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--against', help='path of another AVL.py to compare with')
+    options = parser.parse_args(args)
+
+    rng = random.Random(options.seed)
+    values = rng.sample(range(options.n * 10), options.n)
+    keys = [Key(v) for v in values]
+    churn = [keys[rng.randrange(options.n)] for _ in range(options.n)]
+
+    trees = [('current', load_avl(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'AVL.py')))]
+    if options.against:
+        trees.append(('against', load_avl(options.against)))
+
+    # the recursive trees need more stack than the default limit on large inputs
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+
+    results = [(name, best_of(avl_class, keys, churn, options.repeat)) for name, avl_class in trees]
+    print('n = {0}'.format(options.n))
+    print('{0:<15}'.format('operation') + ''.join('{0:>12}'.format(name) for name, _ in results))
+    for op in results[0][1]:
+        print('{0:<15}'.format(op) + ''.join('{0:>11.3f}s'.format(timings[op]) for _, timings in results))
+
+
+if __name__ == '__main__': main()
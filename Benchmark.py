@@ -0,0 +1,167 @@
+"""
+
+Scaling benchmark of the sweep on the synthetic workloads of Workloads.py, over sizes across orders of
+magnitude. For every workload and size it records the number of intersections and events, the wall time
+of every phase (parsing the input text into coordinates, building the segments, building the sweep,
+running it), the events per second of the run and the peak memory of the parsing and of the sweep.
+
+usage: python Benchmark.py [--workloads W ..] [--sizes N ..] [--repeat R] [--output results.json]
+                           [--against old.json] [--stats] [--backends B ..]
+
+The results are written as JSON, so runs of different commits can be compared: with --against, the
+run times are also printed relative to those of an earlier output file. With --stats, the records
+also hold the counters of an instrumented run (see LineSweep.SweepStats). Every case is swept with
+every line status backend given (default: all of them, see LineSweep.LINE_STATUS_BACKENDS).
+
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from GeometricAux import *
+from LineSweep import LineSweep, SweepStats, LINE_STATUS_BACKENDS
+from Parser import Parser
+from Workloads import WORKLOADS, writeInputFile
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def peakMemory(function):
+    """
+        returns the peak memory in bytes allocated while running function
+    """
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def parsePhases(fileDir):
+    """
+        returns the seconds spent parsing the input file into coordinate blocks and building their segments,
+        and the segments
+    """
+    (blocks, parseSeconds) = timed(lambda: [block for (_, block) in Parser(fileDir).iterCoordinateBlocks()])
+    (segmentSets, buildSeconds) = timed(lambda: [segmentsFromCoordinates(coordinates) for coordinates in blocks])
+    return {'parse': parseSeconds, 'segments': buildSeconds}, segmentSets
+
+
+def sweepPhases(segments, statusBackend='avl'):
+    """
+        returns the seconds spent building the sweep and running it, and the sweep
+    """
+    (sweep, buildSeconds) = timed(lambda: LineSweep(segments, statusBackend=statusBackend))
+    (_, runSeconds) = timed(sweep.run)
+    return {'build': buildSeconds, 'run': runSeconds}, sweep
+
+
+def bestOf(repeat, phases):
+    """
+        runs phases() repeat times and returns the best time of every phase and the result of the last run
+    """
+    best = {}
+    for _ in range(repeat):
+        (seconds, result) = phases()
+        for (phase, value) in seconds.items():
+            best[phase] = min(best.get(phase, value), value)
+    return best, result
+
+
+def benchmark(workload, numOfSegments, repeat=3, seed=0, withStats=False, statusBackend='avl'):
+    """
+        returns the record of one workload of numOfSegments segments swept with the given line status backend.
+        withStats- if true, the counters of an instrumented run (see SweepStats) are added to it
+    """
+    segments = WORKLOADS[workload](numOfSegments, seed)
+
+    (phases, sweep) = bestOf(repeat, lambda: sweepPhases(segments, statusBackend))
+    events = 2 * numOfSegments + sweep.eventsQueue.pushCount
+    sweepPeak = peakMemory(lambda: LineSweep(segments, statusBackend=statusBackend).run())
+
+    fileDir = os.path.join(tempfile.mkdtemp(), 'workload.in')
+    try:
+        writeInputFile(fileDir, [segments])
+        (parse, _) = bestOf(repeat, lambda: parsePhases(fileDir))
+        parsePeak = peakMemory(lambda: list(Parser(fileDir)))
+    finally:
+        os.remove(fileDir)
+        os.rmdir(os.path.dirname(fileDir))
+    phases.update(parse)
+
+    record = {
+        'workload': workload,
+        'numOfSegments': numOfSegments,
+        'backend': statusBackend,
+        'intersections': sweep.getResult(),
+        'events': events,
+        'seconds': phases,
+        'eventsPerSecond': events / phases['run'],
+        'peakBytes': {'sweep': sweepPeak, 'parser': parsePeak},
+    }
+    if withStats:
+        stats = SweepStats()
+        LineSweep(segments, stats=stats, statusBackend=statusBackend).run()
+        record['stats'] = stats.asDict()
+    return record
+
+
+def currentCommit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='scaling benchmark of the sweep on synthetic workloads')
+    parser.add_argument('--workloads', nargs='+', default=sorted(WORKLOADS), choices=sorted(WORKLOADS))
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 300, 1000, 3000])
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case, the best one is reported')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='path of the JSON file of the results')
+    parser.add_argument('--against', help='path of an earlier JSON file of results to compare with')
+    parser.add_argument('--stats', action='store_true', help='add the counters of an instrumented run')
+    parser.add_argument('--backends', nargs='+', default=sorted(LINE_STATUS_BACKENDS),
+                        choices=sorted(LINE_STATUS_BACKENDS), help='the line status backends to sweep with')
+    options = parser.parse_args(args)
+
+    earlier = {}
+    if options.against:
+        with open(options.against) as file:
+            earlier = {(record['workload'], record['numOfSegments'], record.get('backend', 'avl')): record
+                       for record in json.load(file)['results']}
+
+    print('{0:<14}{1:>7}{2:>8}{3:>10}{4:>10}{5:>10}{6:>12}{7:>10}{8:>10}'.format(
+        'workload', 'n', 'backend', 'k', 'run', 'parse', 'events/s', 'peak MB', 'vs old'))
+    results = []
+    for workload in options.workloads:
+        for numOfSegments in options.sizes:
+            for backend in options.backends:
+                record = benchmark(workload, numOfSegments, options.repeat, options.seed, options.stats, backend)
+                results.append(record)
+                old = earlier.get((workload, numOfSegments, backend))
+                print('{0:<14}{1:>7}{2:>8}{3:>10}{4:>9.3f}s{5:>9.3f}s{6:>12.0f}{7:>10.1f}{8:>10}'.format(
+                    workload, numOfSegments, backend, record['intersections'], record['seconds']['run'],
+                    record['seconds']['parse'] + record['seconds']['segments'], record['eventsPerSecond'],
+                    record['peakBytes']['sweep'] / 2 ** 20,
+                    '{0:.2f}x'.format(old['seconds']['run'] / record['seconds']['run']) if old else '-'))
+
+    if options.output:
+        with open(options.output, 'w') as file:
+            json.dump({'commit': currentCommit(), 'python': platform.python_version(),
+                       'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'seed': options.seed,
+                       'results': results}, file, indent=2)
+
+
+if __name__ == '__main__': main()
@@ -0,0 +1,97 @@
+"""
+    Binary container of segment sets, read without parsing.
+
+    layout (little endian):
+        header: magic (8 bytes), version (uint32), number of test cases (uint32), index offset (uint64)
+        blocks: the coordinate block of every test case, x1 y1 x2 y2 per segment as float64
+        index:  per test case, the offset of its block and its number of segments (uint64, uint64)
+
+    usage: python BinaryFormat.py input.in output.seg
+"""
+import mmap
+import struct
+import sys
+from Parser import Parser
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAGIC = b'SEGSETS\0'
+VERSION = 1
+HEADER = struct.Struct('<8sIIQ')
+INDEX_ENTRY = struct.Struct('<QQ')
+
+
+def convert(textFileDir, binaryFileDir):
+    """
+        writes the test cases of the text input file textFileDir into the binary file binaryFileDir,
+        reading one test case at a time. Returns the number of test cases
+    """
+    index = []
+    with open(binaryFileDir, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+        for (_, coordinates) in Parser(textFileDir).iterCoordinateBlocks():
+            index.append((file.tell(), len(coordinates) // 4))
+            file.write(coordinates.tobytes())
+        indexOffset = file.tell()
+        for entry in index:
+            file.write(INDEX_ENTRY.pack(*entry))
+        file.seek(0)
+        file.write(HEADER.pack(MAGIC, VERSION, len(index), indexOffset))
+    return len(index)
+
+
+class SegmentSets(object):
+    """
+        A memory-mapped binary file of segment sets (see convert). Test case i is sets[i]: its coordinate
+        block, a read-only float64 view of the file (a NumPy array, or a memoryview without NumPy), so a
+        test case is read from the disk only when it is used and never copied or parsed
+    """
+
+    def __init__(self, fileDir):
+        self.file = open(fileDir, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, numOfSets, indexOffset) = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError("{0} is not a segment sets file of version {1}".format(fileDir, VERSION))
+        self.index = [INDEX_ENTRY.unpack_from(self.data, indexOffset + i * INDEX_ENTRY.size)
+                      for i in range(numOfSets)]
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, numOfTestCase):
+        (offset, numOfSeg) = self.index[numOfTestCase]
+        if np is not None:
+            return np.frombuffer(self.data, dtype='<f8', count=4 * numOfSeg, offset=offset)
+        return memoryview(self.data)[offset:offset + 32 * numOfSeg].cast('d')
+
+    def __iter__(self):
+        """
+            yields (i, coordinate block of test case i) for i=0,1,.., like Parser.iterCoordinateBlocks
+        """
+        for numOfTestCase in range(len(self)):
+            yield numOfTestCase, self[numOfTestCase]
+
+    def close(self):
+        """
+            closes the file, the coordinate blocks handed out must not be used anymore
+        """
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print('usage: %s input.in output.seg' % sys.argv[0])
+        sys.exit(1)
+    print("{0} test cases written".format(convert(sys.argv[1], sys.argv[2])))
@@ -0,0 +1,145 @@
+from GeometricAux import *
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class BruteForce(object):
+    """
+        Counts the intersection points by testing all the pairs of segments with NumPy, with the same
+        predicates as Segment.intersectsWith. The pairs are evaluated in square tiles of tileSize x tileSize,
+        so the memory does not grow with the number of pairs.
+        Like the pairwise test, a pair is tested from the segment starting first, so overlapping
+        segments count once, where the overlap starts
+    """
+
+    def __init__(self, segmentsSet, precision=PRECISION, tileSize=512):
+        if np is None:
+            raise ImportError("BruteForce requires numpy")
+        checkPrecision(precision)
+        self.segments = sorted(segmentsSet, key=lambda seg: seg.startPoint)
+        self.precision = precision
+        for seg in self.segments:
+            # the points of the pairs tested one by one are rounded to the precision (see getIntersectionPoint)
+            seg.precision = precision
+        self.tileSize = tileSize
+        self.numOfIntersections = 0
+
+        """
+            the columns are start x, start y, end x, end y, the rounded slope, the magnitude and the integral
+            flag (1 or 0) of each segment, in the order of the start points
+        """
+        self.coords = np.array([(seg.startPoint.x, seg.startPoint.y, seg.endPoint.x, seg.endPoint.y, seg.slope,
+                                 seg.magnitude, seg.integral)
+                                for seg in self.segments], dtype=np.float64).reshape(-1, 7)
+
+    @staticmethod
+    def orientation(ax, ay, bx, by, cx, cy):
+        """
+            the float evaluation of orient2d over arrays, returns the determinants
+        """
+        return (ax - cx) * (by - cy) - (ay - cy) * (bx - cx)
+
+    @staticmethod
+    def intersectionPoints(p1x, p1y, p2x, p2y, slope1, q1x, q1y, q2x, q2y, slope2, precision=PRECISION):
+        """
+            Segment.getIntersectionPoint over arrays of crossing pairs, returns the X and Y arrays
+        """
+        X = np.empty_like(p1x)
+        Y = np.empty_like(p1x)
+
+        horizontal1 = slope1 == 0
+        Y[horizontal1] = p1y[horizontal1]
+        param = (Y[horizontal1] - q2y[horizontal1]) / (q1y[horizontal1] - q2y[horizontal1])
+        X[horizontal1] = q1x[horizontal1] * param + (1 - param) * q2x[horizontal1]
+
+        horizontal2 = ~horizontal1 & (slope2 == 0)
+        Y[horizontal2] = q1y[horizontal2]
+        param = (Y[horizontal2] - p2y[horizontal2]) / (p1y[horizontal2] - p2y[horizontal2])
+        X[horizontal2] = p1x[horizontal2] * param + (1 - param) * p2x[horizontal2]
+
+        other = ~(horizontal1 | horizontal2)
+        p1x, p1y, p2x, p2y = p1x[other], p1y[other], p2x[other], p2y[other]
+        q1x, q1y, q2x, q2y = q1x[other], q1y[other], q2x[other], q2y[other]
+        seg2Param = ((q2x - p2x) - (((q2y - p2y) * (p1x - p2x)) / (p1y - p2y))) \
+            / ((((p1x - p2x) * (q1y - q2y)) / (p1y - p2y)) - (q1x - q2x))
+        X[other] = q1x * seg2Param + (1 - seg2Param) * q2x
+        Y[other] = q1y * seg2Param + (1 - seg2Param) * q2y
+
+        return np.round(X, precision), np.round(Y, precision)
+
+    def tileKeys(self, rowStart, rowEnd, colStart, colEnd):
+        """
+            returns the snapped keys of the intersection points of the pairs (i, j), i < j, of the tile
+            rows [rowStart, rowEnd) x columns [colStart, colEnd), as an array of (x key, y key) rows
+        """
+        rows = self.coords[rowStart:rowEnd]
+        cols = self.coords[colStart:colEnd]
+        p1x, p1y, p2x, p2y, _, magnitude1, integral1 = (rows[:, c][:, None] for c in range(7))
+        q1x, q1y, q2x, q2y, _, magnitude2, integral2 = (cols[:, c][None, :] for c in range(7))
+
+        dets = (BruteForce.orientation(p1x, p1y, p2x, p2y, q1x, q1y),
+                BruteForce.orientation(p1x, p1y, p2x, p2y, q2x, q2y),
+                BruteForce.orientation(q1x, q1y, q2x, q2y, p1x, p1y),
+                BruteForce.orientation(q1x, q1y, q2x, q2y, p2x, p2y))
+        (o1, o2, o3, o4) = (np.sign(det) for det in dets)
+
+        # the same filter as Segment.intersectsWith: a sign is certain if the pair is integral or the
+        # determinant is beyond the error bound, otherwise it is zero or ambiguous
+        errorBound = np.where((integral1 != 0) & (integral2 != 0), 0.0,
+                              ORIENT_ERROR_BOUND * np.maximum(magnitude1, magnitude2) ** 2)
+        uncertain = (np.abs(dets[0]) <= errorBound) | (np.abs(dets[1]) <= errorBound) | \
+            (np.abs(dets[2]) <= errorBound) | (np.abs(dets[3]) <= errorBound)
+
+        valid = np.ones(o1.shape, dtype=bool)
+        if rowStart == colStart:
+            valid = np.triu(valid, 1)
+        crossing = valid & ~uncertain & (o1 != o2) & (o3 != o4)
+        uncertainPairs = valid & uncertain
+
+        (i, j) = np.nonzero(crossing)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            (X, Y) = BruteForce.intersectionPoints(
+                rows[i, 0], rows[i, 1], rows[i, 2], rows[i, 3], rows[i, 4],
+                cols[j, 0], cols[j, 1], cols[j, 2], cols[j, 3], cols[j, 4], self.precision)
+        scale = 10 ** self.precision
+        keys = [np.stack((np.rint(X * scale), np.rint(Y * scale)), axis=1).astype(np.int64)]
+
+        # the pairs with an uncertain sign are few (mostly pairs meeting at an end-point), they are tested
+        # exactly by Segment.intersectsWith
+        touchPoints = []
+        for (i, j) in zip(*np.nonzero(uncertainPairs)):
+            intersection = self.segments[rowStart + i].intersectsWith(self.segments[colStart + j])
+            if intersection is not None:
+                touchPoints.append(intersection.snapped(self.precision))
+        if touchPoints:
+            keys.append(np.array(touchPoints, dtype=np.int64))
+
+        return np.unique(np.concatenate(keys), axis=0)
+
+    def run(self):
+        """
+            tests all the tiles, the keys found are merged whenever they outgrow the tiles' size
+        """
+        n = len(self.segments)
+        tileSize = self.tileSize
+        found = np.empty((0, 2), dtype=np.int64)
+        pending = []
+        pendingSize = 0
+        for rowStart in range(0, n, tileSize):
+            for colStart in range(rowStart, n, tileSize):
+                keys = self.tileKeys(rowStart, min(rowStart + tileSize, n), colStart, min(colStart + tileSize, n))
+                pending.append(keys)
+                pendingSize += len(keys)
+                if pendingSize > tileSize * tileSize:
+                    found = np.unique(np.concatenate([found] + pending), axis=0)
+                    pending = []
+                    pendingSize = 0
+        found = np.unique(np.concatenate([found] + pending), axis=0)
+        self.numOfIntersections = len(found)
+        return self
+
+    def getResult(self):
+        return self.numOfIntersections
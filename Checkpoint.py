@@ -0,0 +1,158 @@
+"""
+    Snapshots of a running sweep, so a long sweep that was killed resumes from its latest snapshot instead
+    of from the start. A snapshot holds segment ids and numbers only, never the segment objects: the sweep
+    resuming it is built again from the same input.
+
+    layout (little endian):
+        header: magic (8 bytes), version (uint32), CRC-32 of the sorted end-points of the input (uint32),
+                number of segments, number of end-point events, next end-point event, intersection events
+                pushed, intersections counted, peak found points (uint64), sweep x of the found points and
+                whether it is set (int64, uint32), and the numbers of line status segments, pending
+                intersection events and found points (uint64)
+        status: the ids of the line status segments bottom up (int64), their last visited points (float64 x, y)
+        events: per pending intersection event: its push number, upper and lower segment ids (int64), then
+                the event points (float64 x, y), in the order of the event heap
+        found:  the found points kept (see LineSweep.FoundIntersections), as snapped keys (int64 x, y)
+
+    A snapshot is written after all the events at one x were handled, into a temporary file renamed over
+    the previous snapshot, so a kill while writing leaves the previous one intact.
+    Its size is that of the line status, the pending events and the found points, not of the work done
+    so far, so writing it every few times that many events costs a small fraction of the sweep.
+"""
+import os
+import struct
+import time
+import zlib
+from array import array
+from GeometricAux import *
+
+MAGIC = b'SWEEPCKP'
+VERSION = 1
+HEADER = struct.Struct('<8sII6QqI3Q')
+
+
+def inputChecksum(queue):
+    """
+        the checksum of the sorted end-points of an event queue, telling the input of a snapshot apart
+    """
+    return zlib.crc32(queue.endPointXs.tobytes(), zlib.crc32(queue.endPointCodes.tobytes()))
+
+
+def writeSnapshot(sweep, fileDir):
+    """
+        writes the state of sweep (a LineSweep between two x steps, see LineSweep.sweep) to fileDir
+    """
+    queue = sweep.eventsQueue
+    found = sweep.foundIntersections
+    status = list(sweep.lineStatus)
+
+    statusIds = array('q', (seg.id for seg in status))
+    statusPoints = array('d')
+    for seg in status:
+        statusPoints.extend((seg.lastVisitedPoint.x, seg.lastVisitedPoint.y))
+    eventIds = array('q')
+    eventPoints = array('d')
+    for (x, pushNumber, point, upperSeg, lowerSeg) in queue.heap:
+        eventIds.extend((pushNumber, upperSeg.id, lowerSeg.id))
+        eventPoints.extend((x, point.y))
+    foundKeys = array('q')
+    for (x, keys) in found.keysByX.items():
+        for y in keys:
+            foundKeys.extend((x, y))
+
+    header = HEADER.pack(MAGIC, VERSION, inputChecksum(queue), len(sweep.segments), len(queue.endPointCodes),
+                         queue.nextEndPoint, queue.pushCount, sweep.numOfIntersections, found.peakSize,
+                         found.sweepX if found.sweepX is not None else 0, found.sweepX is not None,
+                         len(status), len(queue.heap), len(foundKeys) // 2)
+    temporaryDir = fileDir + '.tmp'
+    with open(temporaryDir, 'wb') as file:
+        file.write(header)
+        for values in (statusIds, statusPoints, eventIds, eventPoints, foundKeys):
+            file.write(values.tobytes())
+    os.replace(temporaryDir, fileDir)
+
+
+def readArray(file, typecode, count):
+    values = array(typecode)
+    values.frombytes(file.read(values.itemsize * count))
+    return values
+
+
+def loadSnapshot(sweep, fileDir):
+    """
+        restores the state written to fileDir into sweep, a LineSweep just built over the same segments with
+        the same arguments as the one the snapshot was written from
+    """
+    with open(fileDir, 'rb') as file:
+        (magic, version, checksum, numOfSegments, numOfEndPoints, nextEndPoint, pushCount, numOfIntersections,
+         peakSize, sweepX, hasSweepX, numOfStatus, numOfEvents, numOfFound) = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("{0} is not a sweep snapshot of version {1}".format(fileDir, VERSION))
+        queue = sweep.eventsQueue
+        if numOfSegments != len(sweep.segments) or numOfEndPoints != len(queue.endPointCodes) or \
+                checksum != inputChecksum(queue):
+            raise ValueError("{0} is a snapshot of a sweep over other segments".format(fileDir))
+        statusIds = readArray(file, 'q', numOfStatus)
+        statusPoints = readArray(file, 'd', 2 * numOfStatus)
+        eventIds = readArray(file, 'q', 3 * numOfEvents)
+        eventPoints = readArray(file, 'd', 2 * numOfEvents)
+        foundKeys = readArray(file, 'q', 2 * numOfFound)
+
+    # the segments are opened in the store as their start events would have
+    segments = sweep.segments
+    status = []
+    for (i, id) in enumerate(statusIds):
+        seg = segments.open(id)
+        seg.precision = sweep.foundIntersections.precision
+        seg.setLastVisitedPoint(Point(statusPoints[2 * i], statusPoints[2 * i + 1]))
+        status.append(seg)
+    sweep.lineStatus = type(sweep.lineStatus)(sweep.stats)
+    sweep.lineStatus.load(status)
+
+    queue.nextEndPoint = nextEndPoint
+    queue.pushCount = pushCount
+    queue.heap = [(eventPoints[2 * i], eventIds[3 * i], Point(eventPoints[2 * i], eventPoints[2 * i + 1]),
+                   segments.open(eventIds[3 * i + 1]), segments.open(eventIds[3 * i + 2]))
+                  for i in range(numOfEvents)]
+
+    found = sweep.foundIntersections
+    found.keysByX = {}
+    for i in range(0, len(foundKeys), 2):
+        found.keysByX.setdefault(foundKeys[i], set()).add(foundKeys[i + 1])
+    found.xHeap = sorted(found.keysByX)
+    found.sweepX = sweepX if hasSweepX else None
+    found.size = numOfFound
+    found.peakSize = peakSize
+
+    sweep.numOfIntersections = numOfIntersections
+    return sweep
+
+
+def eventsDone(sweep):
+    """
+        the number of events the sweep has popped so far
+    """
+    queue = sweep.eventsQueue
+    return queue.nextEndPoint + queue.pushCount - len(queue.heap)
+
+
+def runWithCheckpoints(sweep, fileDir, everyEvents=None, everySeconds=None):
+    """
+        runs sweep (a LineSweep just built), first resuming it from the snapshot fileDir if there is one,
+        and writes a snapshot there every everyEvents events or everySeconds seconds, whichever comes first.
+        The snapshot is removed once the sweep is done. Returns the sweep.
+        The counters of an instrumented sweep (see SweepStats) are not part of the snapshot
+    """
+    if os.path.exists(fileDir):
+        loadSnapshot(sweep, fileDir)
+    (lastEvents, lastTime) = (eventsDone(sweep), time.perf_counter())
+    for _ in sweep.sweep():
+        events = eventsDone(sweep)
+        now = time.perf_counter()
+        if (everyEvents is not None and events - lastEvents >= everyEvents) or \
+                (everySeconds is not None and now - lastTime >= everySeconds):
+            writeSnapshot(sweep, fileDir)
+            (lastEvents, lastTime) = (events, time.perf_counter())
+    if os.path.exists(fileDir):
+        os.remove(fileDir)
+    return sweep
@@ -0,0 +1,139 @@
+from GeometricAux import *
+from LineSweep import LineSweep
+
+
+def commonSlab(segments):
+    """
+        returns the x-interval (fromX, toX) spanned by all the segments, or None if they do not all
+        span one interval of positive width
+    """
+    if not segments:
+        return None
+    segments = list(segments)
+    fromX = max(seg.startPoint.x for seg in segments)
+    toX = min(seg.endPoint.x for seg in segments)
+    return (fromX, toX) if fromX < toX else None
+
+
+def invertedPairs(values):
+    """
+        yields the pairs (i, j), i < j, of indices with values[i] > values[j], by a bottom-up merge sort of
+        the indices: O(n log n) plus the number of pairs
+    """
+    order = list(range(len(values)))
+    width = 1
+    while width < len(order):
+        merged = []
+        for start in range(0, len(order), 2 * width):
+            left = order[start:start + width]
+            right = order[start + width:start + 2 * width]
+            (a, b) = (0, 0)
+            while a < len(left) and b < len(right):
+                if values[right[b]] < values[left[a]]:
+                    # right[b] comes before all the remaining left indices, and is less than them
+                    for i in left[a:]:
+                        yield i, right[b]
+                    merged.append(right[b])
+                    b += 1
+                else:
+                    merged.append(left[a])
+                    a += 1
+            merged += left[a:]
+            merged += right[b:]
+        order = merged
+        width *= 2
+
+
+class CommonSlabSweep(object):
+    """
+        Counts the intersection points of segments that all span a common x-interval (fromX, toX), such as
+        lanes of time series, without an event queue inside it: two segments cross inside the slab iff
+        their order on the sweep line right after fromX and their order right before toX are inverted, so
+        the crossing pairs are the inversions between the two orders (see invertedPairs).
+        Like Segment.__lt__, segments meeting on a slab boundary are ordered there by slope, and the
+        points on the boundaries are counted like the sweep does (see LineSweep.isIntersection).
+        The parts of the segments outside the slab, if any, are swept on their own (see LineSweep xRange),
+        and a set with no common slab is swept as a whole
+    """
+
+    def __init__(self, segmentsSet, precision=PRECISION):
+        checkPrecision(precision)
+        self.segments = list(segmentsSet)
+        self.precision = precision
+        for seg in self.segments:
+            # the y values on the slab boundaries are rounded to the precision (see Segment.calcYValueByX)
+            seg.precision = precision
+            seg.sweepX = None
+        self.slab = commonSlab(self.segments)
+        self.numOfIntersections = 0
+
+    @staticmethod
+    def yValueAt(seg, x):
+        """
+            the y value of seg at x, the end-point itself when x is one of its ends
+        """
+        if x == seg.startPoint.x:
+            return seg.startPoint.y
+        if x == seg.endPoint.x:
+            return seg.endPoint.y
+        return seg.calcYValueByX(x)
+
+    def boundaryKeys(self, x, ys):
+        """
+            given the y values of the segments at the slab boundary x, returns the keys of the intersection
+            points on it (see Point.snapped)
+        """
+        segsByY = {}
+        for (seg, y) in zip(self.segments, ys):
+            segsByY.setdefault(snap(y, self.precision), []).append(seg)
+        keys = set()
+        for (y, segs) in segsByY.items():
+            point = Point(x, y / 10 ** self.precision)
+            if len(segs) > 1 and LineSweep.isIntersection(point, segs, self.precision):
+                keys.add(point.snapped(self.precision))
+        return keys
+
+    def run(self):
+        if self.slab is None:
+            self.numOfIntersections = LineSweep(self.segments, self.precision).run().getResult()
+            return self
+        (fromX, toX) = self.slab
+        segments = self.segments
+
+        # the parts left and right of the slab; the points on toX are left to the right part, if any
+        count = 0
+        if any(seg.startPoint.x < fromX for seg in segments):
+            count += LineSweep(segments, self.precision, xRange=(None, fromX)).run().getResult()
+        rightPart = any(seg.endPoint.x > toX for seg in segments)
+        if rightPart:
+            count += LineSweep(segments, self.precision, xRange=(toX, None)).run().getResult()
+
+        fromYs = [CommonSlabSweep.yValueAt(seg, fromX) for seg in segments]
+        toYs = [CommonSlabSweep.yValueAt(seg, toX) for seg in segments]
+        keys = self.boundaryKeys(fromX, fromYs)
+        if not rightPart:
+            keys |= self.boundaryKeys(toX, toYs)
+
+        # the order right after fromX, and for every segment in it its rank in the order right before toX
+        afterFrom = sorted(range(len(segments)),
+                           key=lambda i: (snap(fromYs[i], self.precision), segments[i].slope, i))
+        beforeTo = sorted(range(len(segments)),
+                          key=lambda i: (snap(toYs[i], self.precision), -segments[i].slope, i))
+        rankBeforeTo = [0] * len(segments)
+        for (rank, i) in enumerate(beforeTo):
+            rankBeforeTo[i] = rank
+
+        # several pairs may cross at one point, so the crossings are told apart by their keys
+        (fromKey, toKey) = (snap(fromX, self.precision), snap(toX, self.precision))
+        for (a, b) in invertedPairs([rankBeforeTo[i] for i in afterFrom]):
+            intersection = Segment.pairIntersection(segments[afterFrom[a]], segments[afterFrom[b]])
+            if intersection is not None:
+                key = intersection.snapped(self.precision)
+                if fromKey <= key[0] and (key[0] < toKey or (key[0] == toKey and not rightPart)):
+                    keys.add(key)
+
+        self.numOfIntersections = count + len(keys)
+        return self
+
+    def getResult(self):
+        return self.numOfIntersections
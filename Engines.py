@@ -0,0 +1,86 @@
+import argparse
+import time
+from GeometricAux import *
+from LineSweep import LineSweep
+from BruteForce import BruteForce, np
+from Prefilter import GridPrefilter
+from CommonSlab import CommonSlabSweep, commonSlab
+from Workloads import randomSegments
+
+"""
+    cost model of the engines, calibrated by running this module (see calibrate):
+    the sweep costs about SWEEP_SECONDS_PER_EVENT per event (2 per segment + 1 per intersection),
+    the brute force about BRUTE_FORCE_SECONDS_PER_PAIR per pair of segments
+"""
+SWEEP_SECONDS_PER_EVENT = 4.3e-05
+BRUTE_FORCE_SECONDS_PER_PAIR = 1.7e-07
+
+
+def chooseEngine(numOfSegments, density=None):
+    """
+        returns the engine class (LineSweep or BruteForce) expected to be faster on numOfSegments segments.
+        density- the estimated fraction of the pairs of segments that intersect, if known. Without it the
+        input is assumed sparse, so the brute force is chosen only for small inputs
+    """
+    if np is None:
+        return LineSweep
+    pairs = numOfSegments * (numOfSegments - 1) / 2
+    sweepSeconds = SWEEP_SECONDS_PER_EVENT * (2 * numOfSegments + (density or 0) * pairs)
+    bruteForceSeconds = BRUTE_FORCE_SECONDS_PER_PAIR * pairs
+    return BruteForce if bruteForceSeconds < sweepSeconds else LineSweep
+
+
+def countIntersections(segmentsSet, density=None, prefilter=False):
+    """
+        counts the intersection points of segmentsSet with the engine chosen by chooseEngine.
+        prefilter- if true, the segments are first split by a GridPrefilter and every cluster is counted
+        on its own, which pays off on sparse inputs.
+        Segments spanning a common x-interval are counted by CommonSlabSweep, whichever engine is chosen
+    """
+    if prefilter:
+        return sum(countIntersections(cluster, density) for cluster in GridPrefilter(segmentsSet).clusters)
+    if commonSlab(segmentsSet) is not None:
+        return CommonSlabSweep(segmentsSet).run().getResult()
+    engine = chooseEngine(len(segmentsSet), density)
+    return engine(segmentsSet).run().getResult()
+
+
+def calibrate(sizes=(200, 400, 800, 1600), maxLengths=(20, 300)):
+    """
+        times both engines on random segment sets, sparse and dense, and returns the cost model
+        constants (seconds per sweep event, seconds per brute force pair)
+    """
+    sweepSeconds = events = bruteForceSeconds = pairs = 0
+    for numOfSegments in sizes:
+        for maxLength in maxLengths:
+            segmentsSet = randomSegments(numOfSegments, maxLength, seed=numOfSegments)
+
+            start = time.perf_counter()
+            result = LineSweep(segmentsSet).run().getResult()
+            sweepSeconds += time.perf_counter() - start
+            events += 2 * numOfSegments + result
+
+            start = time.perf_counter()
+            BruteForce(segmentsSet).run()
+            bruteForceSeconds += time.perf_counter() - start
+            pairs += numOfSegments * (numOfSegments - 1) / 2
+
+            print("n={0} intersections={1}".format(numOfSegments, result))
+    return sweepSeconds / events, bruteForceSeconds / pairs
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='calibrate the engine selection cost model')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[200, 400, 800, 1600])
+    options = parser.parse_args(args)
+
+    if np is None:
+        print("numpy is not installed, only the sweep is available")
+        return
+    (secondsPerEvent, secondsPerPair) = calibrate(options.sizes)
+    print("SWEEP_SECONDS_PER_EVENT = {0:.2g}".format(secondsPerEvent))
+    print("BRUTE_FORCE_SECONDS_PER_PAIR = {0:.2g}".format(secondsPerPair))
+    print("sparse inputs use the brute force below {0} segments".format(int(4 * secondsPerEvent / secondsPerPair) + 1))
+
+
+if __name__ == '__main__': main()
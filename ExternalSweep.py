@@ -0,0 +1,264 @@
+"""
+    Out-of-core sweep of segment sets larger than the memory, e.g. a test case of a binary segment sets
+    file (see BinaryFormat), whose coordinate block is a memory-mapped view of the file.
+
+    - The end-point events are sorted in runs of runSize events, each written to a file of the work
+      directory, and the runs are merged from memory maps of their files as the sweep advances
+    - The segments are read from the coordinate block only when they start, and dropped when they end
+      (see SegmentStore), so only the segments on the line status are objects in memory
+    - The pending intersection events are held in a heap of at most maxPendingEvents events. When it is
+      full, its farther half is written to a sorted run file and merged back when the sweep reaches it
+    - At most maxFanIn runs of each kind are read at once: the end-point runs are merged maxFanIn at a
+      time into longer runs, pass after pass, and once more than maxFanIn spilled runs have events left
+      they are merged into one. A run file is removed once it is read
+
+    Memory is then the line status and the capped heap, plus a buffer per open run, rather than all the
+    segments and their 2n end-point events, and about 2 * maxFanIn run files are open at once.
+
+    usage: python ExternalSweep.py file.seg [work directory]
+"""
+import heapq
+import itertools
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from GeometricAux import *
+from LineSweep import LineSweep, EventType
+
+END_POINT = struct.Struct('<dq')  # x, code (see EventQueue)
+INTERSECTION = struct.Struct('<ddqqq')  # x, y, push number, upper segment id, lower segment id
+
+
+class RunFile(object):
+    """
+        A file of packed records in sorted order, read back through a memory map, chunk by chunk
+    """
+
+    def __init__(self, fileDir, records, recordStruct):
+        self.fileDir = fileDir
+        with open(fileDir, 'wb') as file:
+            for record in records:
+                file.write(recordStruct.pack(*record))
+        self.recordStruct = recordStruct
+
+    def __iter__(self, chunkSize=4096):
+        """
+            yields the records once: the file is removed when they are all read or the reading is abandoned
+        """
+        try:
+            with open(self.fileDir, 'rb') as file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    return
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    step = chunkSize * self.recordStruct.size
+                    for start in range(0, len(data), step):
+                        # the chunk is copied out, so the map can be closed while the generator is suspended
+                        yield from self.recordStruct.iter_unpack(data[start:start + step])
+        finally:
+            os.remove(self.fileDir)
+
+
+class ExternalEventQueue(object):
+    """
+        The event queue of ExternalSweep, with the interface of EventQueue: the end-point events come from
+        a merge of sorted run files, and the intersection events from a capped heap in memory and the
+        runs it spilled to the disk
+    """
+
+    def __init__(self, segments, workDir, runSize, maxPendingEvents, maxFanIn, foundIntersections):
+        """
+            foundIntersections- the points of the sweep (see FoundIntersections), the spilled events are
+            forgotten in it so that it is bounded too
+        """
+        self.segments = segments
+        self.workDir = workDir
+        self.maxPendingEvents = maxPendingEvents
+        self.maxFanIn = maxFanIn
+        self.foundIntersections = foundIntersections
+        self.numOfRuns = 0
+
+        # the runs of end-point events, ordered like EventQueue: by x, then starts before ends, then by code
+        runs = []
+        for first in range(0, 2 * len(segments), runSize):
+            codes = range(first, min(first + runSize, 2 * len(segments)))
+            events = sorted((segments.endPointX(code), code & 1, code) for code in codes)
+            runs.append(self.newRun(((x, code) for (x, _, code) in events), END_POINT))
+        while len(runs) > maxFanIn:
+            runs = [self.mergeRuns(runs[i:i + maxFanIn], END_POINT, ExternalEventQueue.endPointOrder)
+                    for i in range(0, len(runs), maxFanIn)]
+        self.endPoints = heapq.merge(*(((x, code & 1, code) for (x, code) in run) for run in runs))
+        self.nextEndPoint = next(self.endPoints, None)
+
+        self.heap = []
+        self.spilled = []  # per spilled run with events left: (x, push number, record, iterator)
+        self.pushCount = 0
+
+    @staticmethod
+    def endPointOrder(record):
+        (x, code) = record
+        return x, code & 1, code
+
+    @staticmethod
+    def intersectionOrder(record):
+        return record[0], record[2]
+
+    def newRun(self, records, recordStruct):
+        self.numOfRuns += 1
+        return RunFile(os.path.join(self.workDir, 'run{0}'.format(self.numOfRuns)), records, recordStruct)
+
+    def mergeRuns(self, streams, recordStruct, order):
+        """
+            given sorted record streams (e.g. runs), writes their merge to a new run and returns it
+        """
+        return self.newRun(heapq.merge(*streams, key=order), recordStruct)
+
+    def nextIntersection(self):
+        """
+            returns (x, push number) of the next intersection event, in memory or spilled, or None
+        """
+        heap = self.heap
+        spilled = self.spilled
+        if heap and (not spilled or heap[0][:2] < spilled[0][:2]):
+            return heap[0][:2]
+        return spilled[0][:2] if spilled else None
+
+    def popIntersection(self):
+        heap = self.heap
+        spilled = self.spilled
+        if heap and (not spilled or heap[0][:2] < spilled[0][:2]):
+            (_, _, point, upperSeg, lowerSeg) = heapq.heappop(heap)
+            return point, upperSeg, lowerSeg
+        (_, _, (x, y, _, upperId, lowerId), records) = spilled[0]
+        record = next(records, None)
+        if record is None:
+            heapq.heappop(spilled)
+        else:
+            heapq.heapreplace(spilled, (record[0], record[2], record, records))
+        # the segments of a pending intersection are on the line status, so they are open in the store
+        return Point(x, y), self.segments.open(upperId), self.segments.open(lowerId)
+
+    def popEvent(self):
+        """
+            returns the next event as (point, event type, segment, other segment or None)
+        """
+        endPoint = self.nextEndPoint
+        if endPoint is not None:
+            (x, isEnd, code) = endPoint
+            intersection = self.nextIntersection()
+            if intersection is None or x < intersection[0] or (x == intersection[0] and not isEnd):
+                self.nextEndPoint = next(self.endPoints, None)
+                if isEnd:
+                    seg = self.segments.close(code >> 1)
+                    return seg.endPoint, EventType.END_POINT, seg, None
+                seg = self.segments.open(code >> 1)
+                return seg.startPoint, EventType.START_POINT, seg, None
+        (point, upperSeg, lowerSeg) = self.popIntersection()
+        return point, EventType.INTERSECTION, upperSeg, lowerSeg
+
+    def isEmpty(self):
+        return self.nextEndPoint is None and not self.heap and not self.spilled
+
+    def nextX(self):
+        """
+            returns the x of the next event.
+            Assumption: the queue is not empty
+        """
+        intersection = self.nextIntersection()
+        if self.nextEndPoint is not None and (intersection is None or self.nextEndPoint[0] <= intersection[0]):
+            return self.nextEndPoint[0]
+        return intersection[0]
+
+    def pushIntersectionEvent(self, point, upperSeg, lowerSeg):
+        self.pushCount += 1
+        heapq.heappush(self.heap, (point.x, self.pushCount, point, upperSeg, lowerSeg))
+        if len(self.heap) > self.maxPendingEvents:
+            self.spill()
+
+    def close(self):
+        """
+            stops reading the runs, so their files are closed and removed (see RunFile)
+        """
+        self.endPoints.close()
+        for (_, _, _, records) in self.spilled:
+            records.close()
+        self.spilled = []
+
+    def spill(self):
+        """
+            writes the farther half of the heap to a run file, keeping the nearer half (a sorted list is a heap)
+        """
+        events = sorted(self.heap, key=lambda event: event[:2])
+        keep = len(events) // 2
+        self.heap = events[:keep]
+        for (_, _, point, _, _) in events[keep:]:
+            self.foundIntersections.forget(point)
+        run = self.newRun(((x, point.y, pushNumber, upperSeg.id, lowerSeg.id)
+                           for (x, pushNumber, point, upperSeg, lowerSeg) in events[keep:]), INTERSECTION)
+        if len(self.spilled) == self.maxFanIn:
+            # the spilled runs with events left are merged with the new one, so that few are read at once
+            streams = [itertools.chain((record,), records) for (_, _, record, records) in self.spilled]
+            run = self.mergeRuns(streams + [run], INTERSECTION, ExternalEventQueue.intersectionOrder)
+            self.spilled = []
+        records = iter(run)
+        record = next(records)
+        heapq.heappush(self.spilled, (record[0], record[2], record, records))
+
+
+class ExternalSweep(LineSweep):
+    """
+        The sweep with the event queue on the disk (see ExternalEventQueue), over a coordinate block that
+        may itself be a memory map. It counts the same points as LineSweep
+    """
+
+    def __init__(self, coordinates, precision=PRECISION, workDir=None, runSize=1 << 18,
+                 maxPendingEvents=1 << 18, maxFanIn=64, stats=None, onEvent=None, statusBackend='avl'):
+        """
+            coordinates- a flat coordinate block (x1 y1 x2 y2 per segment), e.g. from BinaryFormat.SegmentSets
+            workDir- the directory of the run files, default: a new temporary directory, removed after run()
+            runSize- the number of end-point events sorted in memory at once
+            maxPendingEvents- the number of intersection events held in memory before half are spilled
+            maxFanIn- the number of runs of each kind read at once, each an open file and memory map
+        """
+        checkPrecision(precision)
+        self.ownWorkDir = workDir is None
+        self.workDir = tempfile.mkdtemp(prefix='sweep') if workDir is None else workDir
+        self.runSize = runSize
+        self.maxPendingEvents = maxPendingEvents
+        self.maxFanIn = maxFanIn
+        super().__init__(SegmentStore(coordinates), precision, stats=stats, onEvent=onEvent,
+                         statusBackend=statusBackend)
+
+    def buildEventQueue(self, segmentsSet, fromX):
+        return ExternalEventQueue(segmentsSet, self.workDir, self.runSize, self.maxPendingEvents, self.maxFanIn,
+                                  self.foundIntersections)
+
+    def run(self):
+        try:
+            return super().run()
+        finally:
+            self.close()
+
+    def close(self):
+        """
+            removes the run files
+        """
+        self.eventsQueue.close()
+        if self.ownWorkDir:
+            shutil.rmtree(self.workDir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    from BinaryFormat import SegmentSets
+
+    if len(sys.argv) not in (2, 3):
+        print('usage: %s file.seg [work directory]' % sys.argv[0])
+        sys.exit(1)
+    workDir = sys.argv[2] if len(sys.argv) == 3 else None
+    with SegmentSets(sys.argv[1]) as sets:
+        # the blocks are views of the memory map of the file, which can not be closed while one is held: no
+        # block or sweep over it outlives its statement
+        for i in range(len(sets)):
+            print("{0}".format(ExternalSweep(sets[i], workDir=workDir).run().getResult()))
@@ -1,30 +1,102 @@
 import math
-from enum import Enum
+from fractions import Fraction
+
+"""
+    number of decimal digits kept in computed coordinates (intersection points and y values on the
+    sweep line). Two computed points are considered the same point iff they agree to this many digits
+"""
+PRECISION = 7
+
+"""
+    the largest precision supported: the computed coordinates times 10^precision must stay exact integers
+    in floats (below 2^53), so the coordinates of the input may be up to about 10^4 in magnitude
+"""
+MAX_PRECISION = 11
+
+
+def checkPrecision(precision):
+    """
+        raises ValueError unless PRECISION <= precision <= MAX_PRECISION. On a coarser grid the crossings
+        of near-concurrent segments a few grid units apart can not be ordered on the sweep line, and the
+        sweeps would lose some of them
+    """
+    if not PRECISION <= precision <= MAX_PRECISION:
+        raise ValueError("precision {0} is out of the supported range {1}..{2}".format(precision, PRECISION,
+                                                                                    MAX_PRECISION))
 
 
 def epsilon_eq(x, y, epsilon):
     return abs(x - y) <= epsilon
 
 
-class Sign(Enum):
+def snap(value, precision=PRECISION):
     """
-        Represents the sign of the triangle orientation computation
+        returns the coordinate value as an integer number of 10^-precision grid units
     """
-    POSITIVE = 1
-    ZERO = 0
-    NEGATIVE = -1
+    return int(round(value * 10 ** precision))
+
+
+"""
+    static error bound of the float evaluation of orient2d, per squared coordinate magnitude: for points
+    whose coordinates are at most M in absolute value, the float determinant is within
+    ORIENT_ERROR_BOUND * M^2 of the exact determinant of the decimal numbers the coordinates were read
+    from (it covers both the rounding of the decimals to floats and the rounding of the evaluation)
+"""
+ORIENT_ERROR_BOUND = 64 * 2.0 ** -53
+
+"""
+    integer coordinates below this magnitude have an exact float determinant (every product and
+    difference stays below 2^53), so their orientation needs no error bound
+"""
+EXACT_INTEGER_BOUND = 2 ** 25
+
+
+def orientationErrorBound(magnitude):
+    """
+        returns the error bound of orient2d for points whose coordinates are at most magnitude in absolute value
+    """
+    return ORIENT_ERROR_BOUND * magnitude * magnitude
+
+
+def orient2d(ax, ay, bx, by, cx, cy, errorBound=None):
+    """
+        returns 1 if the points a, b, c make a left turn, -1 if they make a right turn and 0 if they are
+        collinear. The determinant is evaluated in floats, and only when its magnitude is within the
+        error bound it is evaluated again exactly (see orient2dExact).
+        errorBound- default: orientationErrorBound of the largest coordinate
+    """
+    det = (ax - cx) * (by - cy) - (ay - cy) * (bx - cx)
+    if errorBound is None:
+        errorBound = orientationErrorBound(max(abs(ax), abs(ay), abs(bx), abs(by), abs(cx), abs(cy)))
+    if det > errorBound:
+        return 1
+    if det < -errorBound:
+        return -1
+    return orient2dExact(ax, ay, bx, by, cx, cy)
+
+
+def orient2dExact(ax, ay, bx, by, cx, cy):
+    """
+        orient2d in exact rational arithmetic. A coordinate is taken as the shortest decimal that reads
+        back as it, the number written in the input, so points given on a common line in decimals are
+        collinear even though their floats are not
+    """
+    (ax, ay, bx, by, cx, cy) = (Fraction(repr(float(c))) for c in (ax, ay, bx, by, cx, cy))
+    det = (ax - cx) * (by - cy) - (ay - cy) * (bx - cx)
+    return (det > 0) - (det < 0)
 
-    @staticmethod
-    def getSign(x):
-        if x < 0:
-            return Sign.NEGATIVE
-        elif x == 0:
-            return Sign.ZERO
-        else:
-            return Sign.POSITIVE
+
+def orient2dIntegral(ax, ay, bx, by, cx, cy):
+    """
+        orient2d of points with integer coordinates below EXACT_INTEGER_BOUND, whose float determinant is exact
+    """
+    det = (ax - cx) * (by - cy) - (ay - cy) * (bx - cx)
+    return (det > 0) - (det < 0)
 
 
 class Point(object):
+    __slots__ = ('x', 'y')
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -54,21 +126,31 @@ class Point(object):
         return self > other or self == other
 
     @staticmethod
-    def orientation(point1, point2, point3) -> Sign:
+    def orientation(point1, point2, point3) -> int:
+        """
+            triangle orientation computation as was taught in class: 1, 0 or -1 (see orient2d)
+        """
+        return orient2d(point1.x, point1.y, point2.x, point2.y, point3.x, point3.y)
+
+    def snapped(self, precision=PRECISION):
         """
-            triangle orientation computation as was taught in class
+            returns a hashable key of the point on the 10^-precision grid, equal for points that are
+            the same up to the rounding of computed coordinates
         """
-        det = point1.x * (point2.y - point3.y) - point1.y * (point2.x - point3.x) + \
-              (point2.x * point3.y - point2.y * point3.x)
-        det = round(det, 6)
-        return Sign.getSign(det)
+        return snap(self.x, precision), snap(self.y, precision)
 
     def __str__(self):
         return "({0},{1})".format(self.x, self.y)
 
 
 class Segment(object):
-    def __init__(self, point1, point2):
+    __slots__ = ('startPoint', 'endPoint', 'lastVisitedPoint', 'statusNode', 'sweepX', 'sweepY', 'precision',
+                 'lineSlope', 'lineIntercept', 'slope', 'magnitude', 'integral', 'id')
+
+    def __init__(self, point1, point2, id=None):
+        """
+            id- the segment id, the index of the segment in its SegmentStore or in the list being swept
+        """
         if point1 < point2:
             self.startPoint = point1
             self.endPoint = point2
@@ -78,9 +160,43 @@ class Segment(object):
 
         """
             lastVisitedPoint- the most recently inspected point on the segment
+            statusNode- the line status handle of the segment while it intersects the sweep line (see LineStatus)
+            sweepX, sweepY- the last x the segment's y value was computed at and that y value
+            precision- the number of decimal digits of the intersection points, of the y values and of their
+            comparisons on the sweep line, set by the engine the segment is in (see LineSweep precision)
         """
+        self.id = id
         self.lastVisitedPoint = self.startPoint
-        self.slope = round((self.endPoint.y - self.startPoint.y) / (self.endPoint.x - self.startPoint.x), 6)
+        self.statusNode = None
+        self.sweepX = None
+        self.sweepY = None
+        self.precision = PRECISION
+
+        """
+            the segment lies on the line y = lineSlope * x + lineIntercept.
+            slope is the rounded slope used to order segments that meet at a point
+        """
+        self.lineSlope = (self.endPoint.y - self.startPoint.y) / (self.endPoint.x - self.startPoint.x)
+        self.lineIntercept = self.startPoint.y - self.lineSlope * self.startPoint.x
+        self.slope = round(self.lineSlope, 6)
+
+        """
+            magnitude- the largest absolute value of the end-point coordinates.
+            integral- true iff all the end-point coordinates are integers below EXACT_INTEGER_BOUND, so the
+            orientations among the end-points of integral segments are exact in floats
+        """
+        self.magnitude = max(abs(point1.x), abs(point1.y), abs(point2.x), abs(point2.y))
+        self.integral = self.magnitude < EXACT_INTEGER_BOUND and \
+            all(float(c).is_integer() for c in (point1.x, point1.y, point2.x, point2.y))
+
+    def boundingBoxContains(self, point):
+        """
+            returns true iff point lies in the bounding box of the segment, which for a point collinear
+            with the segment means it belongs to the segment
+        """
+        (lowY, highY) = (self.startPoint.y, self.endPoint.y) if self.startPoint.y <= self.endPoint.y \
+            else (self.endPoint.y, self.startPoint.y)
+        return self.startPoint.x <= point.x <= self.endPoint.x and lowY <= point.y <= highY
 
     def containsPoint(self, point):
         """
@@ -88,8 +204,7 @@ class Segment(object):
         :param point:
         :return: true iff point belongs to Self (segment)
         """
-        return self.startPoint.distanceFrom(self.endPoint) == \
-               self.startPoint.distanceFrom(point) + point.distanceFrom(self.endPoint)
+        return Point.orientation(self.startPoint, self.endPoint, point) == 0 and self.boundingBoxContains(point)
 
     def intersectsWith(self, otherSeg):
         """
@@ -97,31 +212,43 @@ class Segment(object):
         :param otherSeg:
         :return: None if seg does not intersect with otherSeg, otherwise the intersection point
         """
-        orientation1 = Point.orientation(self.startPoint, self.endPoint, otherSeg.startPoint)
-        orientation2 = Point.orientation(self.startPoint, self.endPoint, otherSeg.endPoint)
-        orientation3 = Point.orientation(otherSeg.startPoint, otherSeg.endPoint, self.startPoint)
-        orientation4 = Point.orientation(otherSeg.startPoint, otherSeg.endPoint, self.endPoint)
+        p1 = self.startPoint
+        p2 = self.endPoint
+        q1 = otherSeg.startPoint
+        q2 = otherSeg.endPoint
+        if self.integral and otherSeg.integral:
+            orientation1 = orient2dIntegral(p1.x, p1.y, p2.x, p2.y, q1.x, q1.y)
+            orientation2 = orient2dIntegral(p1.x, p1.y, p2.x, p2.y, q2.x, q2.y)
+            orientation3 = orient2dIntegral(q1.x, q1.y, q2.x, q2.y, p1.x, p1.y)
+            orientation4 = orient2dIntegral(q1.x, q1.y, q2.x, q2.y, p2.x, p2.y)
+        else:
+            errorBound = orientationErrorBound(max(self.magnitude, otherSeg.magnitude))
+            orientation1 = orient2d(p1.x, p1.y, p2.x, p2.y, q1.x, q1.y, errorBound)
+            orientation2 = orient2d(p1.x, p1.y, p2.x, p2.y, q2.x, q2.y, errorBound)
+            orientation3 = orient2d(q1.x, q1.y, q2.x, q2.y, p1.x, p1.y, errorBound)
+            orientation4 = orient2d(q1.x, q1.y, q2.x, q2.y, p2.x, p2.y, errorBound)
 
         if orientation1 != orientation2 and orientation3 != orientation4:
             return Segment.getIntersectionPoint(self, otherSeg)
 
-        if orientation1 == Sign.ZERO and self.containsPoint(otherSeg.startPoint):
-            return otherSeg.startPoint
+        if orientation1 == 0 and self.boundingBoxContains(q1):
+            return q1
 
-        if orientation2 == Sign.ZERO and self.containsPoint(otherSeg.endPoint):
-            return otherSeg.endPoint
+        if orientation2 == 0 and self.boundingBoxContains(q2):
+            return q2
 
-        if orientation3 == Sign.ZERO and otherSeg.containsPoint(self.startPoint):
-            return self.startPoint
+        if orientation3 == 0 and otherSeg.boundingBoxContains(p1):
+            return p1
 
-        if orientation4 == Sign.ZERO and otherSeg.containsPoint(self.endPoint):
-            return self.endPoint
+        if orientation4 == 0 and otherSeg.boundingBoxContains(p2):
+            return p2
 
         return None
 
     @staticmethod
     def getIntersectionPoint(seg1, seg2):
         """
+            returns the intersection point rounded to the precision of the segments.
             Assumption: seg1 intersects with seg2
         """
         p1 = seg1.startPoint
@@ -147,39 +274,181 @@ class Segment(object):
             X = q1.x * seg2Param + (1 - seg2Param) * q2.x
             Y = q1.y * seg2Param + (1 - seg2Param) * q2.y
 
-        return Point(round(X, 7), round(Y, 7))
+        precision = min(seg1.precision, seg2.precision)
+        return Point(round(X, precision), round(Y, precision))
 
     def setLastVisitedPoint(self, point):
         self.lastVisitedPoint = point
 
     def calcYValueByX(self, x):
         """
-            given x, calculates the y value corresponding to the point (x,y) belonging to self segment
+            given x, calculates the y value corresponding to the point (x,y) belonging to self segment.
+            The value is kept until it is asked for another x, so the comparisons made while the sweep line
+            stays at one x compute it once per segment
             Assumption: x is valid
         """
-        if self.slope == 0:
-            return self.startPoint.y
+        if x == self.sweepX:
+            return self.sweepY
+        y = round(self.lineSlope * x + self.lineIntercept, self.precision)
+        self.sweepX = x
+        self.sweepY = y
+        return y
 
-        st = self.startPoint
-        en = self.endPoint
-        return round((en.y * st.x - en.x * st.y - en.y * x + st.y * x) / (st.x - en.x), 7)
+    @staticmethod
+    def pairIntersection(seg, otherSeg):
+        """
+            returns the intersection point of two segments tested from the one starting first (see
+            intersectsWith), so a pair always gets the same point, whatever order it is given in
+        """
+        (first, second) = (otherSeg, seg) if otherSeg.startPoint < seg.startPoint else (seg, otherSeg)
+        return first.intersectsWith(second)
+
+    def passesNear(self, point, precision=PRECISION):
+        """
+            given a point whose x is within the segment's x range, returns false if the segment passes far from
+            it: a cheap test ruling out most segments before intersectsAt, with a margin of a hundred grid units
+            (times the slope) over the rounding of computed points, so it never rules out one meeting at point
+        """
+        return abs(self.lineSlope * point.x + self.lineIntercept - point.y) <= \
+            10 ** (2 - precision) * (1 + abs(self.lineSlope))
+
+    def passesThrough(self, point):
+        """
+            returns true iff point is exactly on the line of the segment (see orient2d)
+        """
+        return Point.orientation(self.startPoint, self.endPoint, point) == 0
+
+    def intersectsAt(self, otherSeg, key, precision=PRECISION):
+        """
+            returns true iff the intersection point of self and otherSeg (see pairIntersection) is the point of
+            the snapped key (see Point.snapped): the same test as between all the pairs, so segments passing
+            close to a point without meeting there are not taken for meeting at it
+        """
+        intersection = Segment.pairIntersection(self, otherSeg)
+        return intersection is not None and intersection.snapped(precision) == key
 
     def __lt__(self, other):
         """
             defines a < operator for segments: A is less than B if
             in relation to the sweep line which intersects them both,
             A's y value of intersection with the sweep line is less than that of B
-            or in case their intersection points with sweep line overlap then
-            A's slope is smaller
+            or in case their intersection points with sweep line overlap (up to ten grid units of the
+            precision of A) then A's slope is smaller
         """
         lineSweepPos = max(self.lastVisitedPoint.x, other.lastVisitedPoint.x)
 
         selfY = self.calcYValueByX(lineSweepPos)
         otherY = other.calcYValueByX(lineSweepPos)
 
-        if epsilon_eq(selfY, otherY, 0.000001):
+        if epsilon_eq(selfY, otherY, 1.5 * 10 ** -self.precision):
             return self.slope < other.slope
         return selfY < otherY
 
     def __str__(self):
         return "start: {0} end: {1}".format(self.startPoint, self.endPoint)
+
+
+def segmentsFromCoordinates(coordinates):
+    """
+        given a flat coordinate block (x1 y1 x2 y2 per segment, any sequence with tolist() such as a
+        NumPy array, an array('d') or a memoryview), returns its segments as a list in the order of the
+        block, so the index of a segment in the list is its row in the block
+    """
+    values = coordinates.tolist()
+    return [Segment(Point(values[i], values[i + 1]), Point(values[i + 2], values[i + 3]))
+            for i in range(0, len(values), 4)]
+
+
+class SegmentStore(object):
+    """
+        Segments kept in columns rather than objects: the flat coordinate block (x1 y1 x2 y2 per segment as
+        float64, such as a NumPy array, an array('d') or a memoryview of a BinaryFormat file), referenced
+        without a copy and indexed by segment id. A Segment object (a view of one row) is made only while a
+        sweep needs it, see open and close, so the memory per segment idle in the store is its 32 bytes of
+        coordinates instead of the objects of a Segment, its Points and their floats.
+        The block can be shared as it is with workers (its bytes) and NumPy kernels (see asArray)
+    """
+    __slots__ = ('coordinates', 'openSegments')
+
+    def __init__(self, coordinates):
+        # a float64 memoryview, indexed into Python floats whatever the block type is
+        self.coordinates = memoryview(coordinates).cast('B').cast('d')
+        self.openSegments = {}
+
+    def __len__(self):
+        return len(self.coordinates) // 4
+
+    def segment(self, id):
+        """
+            returns a new Segment of the row id
+        """
+        values = self.coordinates[4 * id:4 * id + 4]
+        return Segment(Point(values[0], values[1]), Point(values[2], values[3]), id)
+
+    def __iter__(self):
+        for id in range(len(self)):
+            yield self.segment(id)
+
+    def endPointX(self, code):
+        """
+            given an end-point code, 2 * id + (0 for the start point, 1 for the end point), returns its x
+        """
+        coordinates = self.coordinates
+        i = 4 * (code >> 1)
+        (x1, x2) = (coordinates[i], coordinates[i + 2])
+        if code & 1:
+            return x1 if x1 > x2 else x2
+        return x1 if x1 < x2 else x2
+
+    def open(self, id):
+        """
+            returns the Segment of id, made on the first call and kept until close(id)
+        """
+        seg = self.openSegments.get(id)
+        if seg is None:
+            seg = self.openSegments[id] = self.segment(id)
+        return seg
+
+    def close(self, id):
+        """
+            returns the Segment of id and lets it go
+        """
+        return self.openSegments.pop(id)
+
+    def asArray(self):
+        """
+            returns the block as an n x 4 NumPy array sharing its memory
+        """
+        import numpy as np
+        return np.frombuffer(self.coordinates, dtype=np.float64).reshape(-1, 4)
+
+
+class SegmentList(object):
+    """
+        A list of Segment objects behind the interface of SegmentStore, the id of a segment being its index
+    """
+    __slots__ = ('segments',)
+
+    def __init__(self, segments):
+        self.segments = list(segments)
+        for (id, seg) in enumerate(self.segments):
+            seg.id = id
+
+    def __len__(self):
+        return len(self.segments)
+
+    def segment(self, id):
+        return self.segments[id]
+
+    def __iter__(self):
+        return iter(self.segments)
+
+    def endPointX(self, code):
+        seg = self.segments[code >> 1]
+        return seg.endPoint.x if code & 1 else seg.startPoint.x
+
+    def open(self, id):
+        return self.segments[id]
+
+    def close(self, id):
+        return self.segments[id]
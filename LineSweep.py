@@ -1,179 +1,792 @@
+import bisect
 import heapq
+import time
+from enum import Enum
+from array import array
 from GeometricAux import *
 from Avl.AVL import AVL
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 class EventType(Enum):
+    """
+        Events at the same x are handled by the order of their types: start points, then intersections
+        and then end points
+    """
     START_POINT = 0
     INTERSECTION = 1
     END_POINT = 2
 
-    def __le__(self, other):
+
+class EventQueue(object):
+    """
+        Merges two streams of events by (x, type):
+        the end-points, known up front, sorted once into packed arrays (no object per event), and
+        a min heap holding only the intersection events discovered during the sweep
+    """
+
+    def __init__(self, segments, fromX=None):
+        """
+            Given the segments (a SegmentStore or a SegmentList), initialize the event queue with two end-points
+            per segment. An end-point is coded as 2 * (segment id) + (0 for start, 1 for end), and the Segment
+            objects are opened in the store at their start point and closed at their end point
+            fromX- if given, the end-points left of it are left out
+        """
+        self.segments = segments
+        codes = list(range(2 * len(segments)))
+        if fromX is not None:
+            codes = [code for code in codes if segments.endPointX(code) >= fromX]
+        codes.sort(key=lambda code: code & 1)  # the sort is stable, so this orders same x points by type
+        codes.sort(key=segments.endPointX)
+        self.endPointCodes = array('q', codes)
+        self.endPointXs = array('d', map(segments.endPointX, codes))
+        self.nextEndPoint = 0
+
+        self.heap = []
+        self.pushCount = 0
+
+    def popEvent(self):
+        """
+            returns the next event as (point, event type, segment, other segment or None)
+        """
+        i = self.nextEndPoint
+        heap = self.heap
+        if i < len(self.endPointCodes):
+            x = self.endPointXs[i]
+            code = self.endPointCodes[i]
+            if not heap or x < heap[0][0] or (x == heap[0][0] and not code & 1):
+                self.nextEndPoint = i + 1
+                if code & 1:
+                    seg = self.segments.close(code >> 1)
+                    return seg.endPoint, EventType.END_POINT, seg, None
+                seg = self.segments.open(code >> 1)
+                return seg.startPoint, EventType.START_POINT, seg, None
+        (_, _, point, upperSeg, lowerSeg) = heapq.heappop(heap)
+        return point, EventType.INTERSECTION, upperSeg, lowerSeg
+
+    def isEmpty(self):
+        return self.nextEndPoint == len(self.endPointCodes) and not self.heap
+
+    def nextX(self):
+        """
+            returns the x of the next event.
+            Assumption: the queue is not empty
+        """
+        i = self.nextEndPoint
+        if i < len(self.endPointCodes):
+            x = self.endPointXs[i]
+            if self.heap and self.heap[0][0] < x:
+                return self.heap[0][0]
+            return x
+        return self.heap[0][0]
+
+    def pushIntersectionEvent(self, point, upperSeg, lowerSeg):
+        # the push counter breaks ties of x, so the heap never compares points or segments
+        self.pushCount += 1
+        heapq.heappush(self.heap, (point.x, self.pushCount, point, upperSeg, lowerSeg))
+
+
+class SweepStats(object):
+    """
+        Counters of a sweep run, collected when given to LineSweep (see LineSweep stats):
+        events- the number of events of every EventType
+        comparisons- Segment.__lt__ calls made by the inserts into the line status (see CountingKey)
+        rotations- rotations of the line status tree
+        heapPushes, heapPops- intersection events pushed into and popped from the event queue heap
+        intersectionTests, intersectionHits- intersectsWith calls on adjacent segments and those finding a point
+        dedupHits- the points found that were already known (see FoundIntersections)
+        seconds- the time spent building the sweep ('build'), draining the events ('events') and handling
+        the event points ('points')
+    """
+
+    def __init__(self):
+        self.events = {eventType: 0 for eventType in EventType}
+        self.comparisons = 0
+        self.rotations = 0
+        self.heapPushes = 0
+        self.heapPops = 0
+        self.intersectionTests = 0
+        self.intersectionHits = 0
+        self.dedupHits = 0
+        self.seconds = {'build': 0.0, 'events': 0.0, 'points': 0.0}
+
+    def asDict(self):
         """
-            defines priority among the event types: Intersection is weaker than start but stronger than
-            ending
+            returns the counters as a dictionary of plain values (e.g. for JSON)
         """
-        return self.value <= other.value
+        counters = dict(vars(self))
+        counters['events'] = {eventType.name: count for (eventType, count) in self.events.items()}
+        counters['seconds'] = dict(self.seconds)
+        return counters
 
+    def __str__(self):
+        return "\n".join("{0}: {1}".format(name, value) for (name, value) in self.asDict().items())
 
-class EventQueueItem(object):
+
+class CountingKey(object):
     """
-        This class wraps the point with its type and the segment it belongs to
+        A key counting the comparisons made with it into a SweepStats while it is inserted into the line
+        status, as the new key of a tree insertion or the searched key of a bisect (both compare it first)
     """
+    __slots__ = ('key', 'stats')
 
-    def __init__(self, point, pointType, segList):
-        self.point = point
-        self.pointType = pointType
-        self.segList = segList
+    def __init__(self, key, stats):
+        self.key = key
+        self.stats = stats
 
     def __lt__(self, other):
+        self.stats.comparisons += 1
+        return self.key < other
+
+
+class CountingAVL(AVL):
+    """
+        An AVL counting its key comparisons and rotations into a SweepStats. Used only by instrumented
+        sweeps, so the plain tree pays nothing for the counting
+    """
+
+    def __init__(self, stats):
+        super().__init__()
+        self.stats = stats
+
+    def insert(self, k):
+        node = super().insert(CountingKey(k, self.stats))
+        node.key = k
+        return node
+
+    def left_rotate(self, x):
+        self.stats.rotations += 1
+        super().left_rotate(x)
+
+    def right_rotate(self, x):
+        self.stats.rotations += 1
+        super().right_rotate(x)
+
+
+class LineStatus(object):
+    """
+        This class represents a sweep line status: the segments currently intersecting the sweep line, in
+        their order along it. A backend keeps them, given a handle on every segment (seg.statusNode), by:
+        insert(seg), remove(seg), neighbors(seg) (the segments right below and above it, or None),
+        swap(seg1, seg2) of two adjacent segments, rearrange(run, newOrder) of a run of adjacent segments and
+        iteration bottom up. The handling of the runs of segments meeting at a point is common to the backends
+    """
+
+    def below(self, seg):
+        return self.neighbors(seg)[0]
+
+    def above(self, seg):
+        return self.neighbors(seg)[1]
+
+    def adjSeg(self, seg):
         """
-            Definition of < between the event queue items:
-            firstly by x, if same x then by type
+            given a segment in the self line status, returns both the adjacent segments
         """
-        if self.point.x < other.point.x:
-            return True
-        elif self.point.x == other.point.x:
-            return self.pointType <= other.pointType
-        else:
-            return False
+        (prevSeg, nextSeg) = self.neighbors(seg)
+        return nextSeg, prevSeg
+
+    def runThrough(self, point, seg, precision=PRECISION):
+        """
+            given a segment in the line status meeting point, returns it together with the adjacent segments
+            meeting one of the run there (see Segment.intersectsAt), in the line status order. Not only the
+            nearest one: the intersection of two overlapping segments is where the overlap starts, so a segment
+            crossing them may meet the farther one only
+        """
+        key = point.snapped(precision)
+        run = [seg]
+        (prevSeg, nextSeg) = self.neighbors(seg)
+        # the run grows at both ends until neither neighbor meets it, each tested once against every member:
+        # the neighbor below was tested against the prevTested bottom members, the one above against the
+        # nextTested top members
+        (prevTested, nextTested) = (0, 0)
+        while prevTested < len(run) or nextTested < len(run):
+            if prevSeg is not None and prevSeg.passesNear(point, precision) and \
+                    any(prevSeg.intersectsAt(runSeg, key, precision) for runSeg in run[prevTested:]):
+                run.insert(0, prevSeg)
+                (prevSeg, prevTested) = (self.below(prevSeg), 0)
+                continue
+            prevTested = len(run)
+            if nextSeg is not None and nextSeg.passesNear(point, precision) and \
+                    any(nextSeg.intersectsAt(runSeg, key, precision) for runSeg in run[:len(run) - nextTested]):
+                run.append(nextSeg)
+                (nextSeg, nextTested) = (self.above(nextSeg), 0)
+                continue
+            nextTested = len(run)
+        return run
+
+    def reorderRun(self, run, endingSegs):
+        """
+            given a run of adjacent segments meeting at the sweep point (see runThrough), removes the ones in
+            endingSegs and puts the others in their order past the point in a single pass: by slope, the
+            bigger the slope the upper the segment.
+            returns the remaining segments of the run, bottom up
+        """
+        if len(run) == 2 and not endingSegs:
+            # the common case of two segments crossing
+            if run[0].slope > run[1].slope:
+                self.swap(run[0], run[1])
+                return [run[1], run[0]]
+            return run
+
+        # the sort is stable, so overlapping segments of equal slope keep their order
+        continuing = sorted((seg for seg in run if seg not in endingSegs), key=lambda seg: seg.slope)
+        ending = [seg for seg in run if seg in endingSegs]
+        self.rearrange(run, continuing + ending)
+        for seg in ending:
+            self.remove(seg)
+        return continuing
+
+    def load(self, segs):
+        """
+            fills an empty line status with segs, given bottom up (e.g. from a snapshot, see Checkpoint).
+            Segments meeting at the sweep line may compare in an order other than the one the sweep gave
+            them, so after the inserts the segments are put in the given order
+        """
+        for seg in segs:
+            self.insert(seg)
+        self.rearrange(list(self), segs)
 
-    def getData(self):
-        return self.point, self.pointType, self.segList
 
+class AVLLineStatus(LineStatus):
+    """
+        The line status in an AVL tree. The handle of a segment is its tree node, so neighbor queries and
+        removals do not search the tree
+    """
 
-class EventQueue(object):
-    def __init__(self, segmentsSet):
+    def __init__(self, stats=None):
         """
-            Given the set of segments, initialize the event queue by inserting two end-points
-            per segment
+            stats- if given, a SweepStats the comparisons and rotations of the tree are counted into
         """
-        self.heap = [EventQueueItem(seg.startPoint, EventType.START_POINT, [seg]) for seg in
-                     segmentsSet] + [EventQueueItem(seg.endPoint, EventType.END_POINT, [seg]) for seg in
-                                     segmentsSet]
-        heapq.heapify(self.heap)
+        self.container = CountingAVL(stats) if stats is not None else AVL()
 
-    def popEvent(self):
-        return heapq.heappop(self.heap)
+    def insert(self, seg):
+        seg.statusNode = self.container.insert(seg)
 
-    def isEmpty(self):
-        return len(self.heap) == 0
+    def remove(self, seg):
+        node = seg.statusNode
+        deleted = self.container.delete_node(node)
+        if deleted is not node:
+            # the node was not unlinked but took over its successor's key, re-point the successor
+            node.key.statusNode = node
+        seg.statusNode = None
 
-    def pushIntersectionEvent(self, point, upperSeg, lowerSeg):
-        heapq.heappush(self.heap, EventQueueItem(point, EventType.INTERSECTION, [lowerSeg, upperSeg]))
+    def below(self, seg):
+        node = seg.statusNode.prev_smaller()
+        return node and node.key
 
+    def above(self, seg):
+        node = seg.statusNode.next_larger()
+        return node and node.key
 
-class LineStatus(object):
+    def neighbors(self, seg):
+        return self.below(seg), self.above(seg)
+
+    def swap(self, seg1, seg2):
+        """
+            exchanges the positions of two segments in the line status without restructuring the tree.
+            Assumption: seg1 and seg2 are adjacent
+        """
+        node1 = seg1.statusNode
+        node2 = seg2.statusNode
+        node1.key, node2.key = seg2, seg1
+        seg1.statusNode, seg2.statusNode = node2, node1
+
+    def rearrange(self, run, newOrder):
+        """
+            puts the segments of newOrder, a permutation of the run of adjacent segments, in the run's nodes
+        """
+        nodes = [seg.statusNode for seg in run]
+        for (node, seg) in zip(nodes, newOrder):
+            node.key = seg
+            seg.statusNode = node
+
+    def __iter__(self):
+        node = self.container.find_min()
+        while node is not None:
+            yield node.key
+            node = node.next_larger()
+
+
+class SortedArrayLineStatus(LineStatus):
     """
-        This class represents a sweep line status : AVL tree containing all currently
-        intersecting segments
+        The line status in a contiguous list, with insertions by bisect (the segments' comparison is done
+        by the C bisect loop) and list inserts and deletes moving the pointers above at C speed.
+        The handle of a segment is its last known index, a hint checked before use: when inserts or removes
+        below the segment made it stale, the segment is looked up by identity starting a little below it
     """
 
-    def __init__(self):
-        self.container = AVL()
+    def __init__(self, stats=None):
+        """
+            stats- if given, a SweepStats the comparisons of the binary searches are counted into
+        """
+        self.segs = []
+        self.stats = stats
+
+    def indexOf(self, seg):
+        i = seg.statusNode
+        segs = self.segs
+        if i < len(segs) and segs[i] is seg:
+            return i
+        try:
+            i = segs.index(seg, max(0, i - 16))
+        except ValueError:
+            i = segs.index(seg)
+        seg.statusNode = i
+        return i
 
     def insert(self, seg):
-        self.container.insert(seg)
+        i = bisect.bisect_right(self.segs, seg if self.stats is None else CountingKey(seg, self.stats))
+        self.segs.insert(i, seg)
+        seg.statusNode = i
 
     def remove(self, seg):
-        self.container.delete(seg)
+        del self.segs[self.indexOf(seg)]
+        seg.statusNode = None
 
-    def adjSeg(self, seg):
-        """
-            given a segment in the self line status, returns both the adjacent segments
-        """
-        nextSeg = self.container.next_larger(seg)
+    def below(self, seg):
+        i = self.indexOf(seg)
+        return self.segs[i - 1] if i > 0 else None
 
-        prevSeg = self.container.prev_smaller(seg)
+    def above(self, seg):
+        i = self.indexOf(seg) + 1
+        return self.segs[i] if i < len(self.segs) else None
 
-        if nextSeg is not None:
-            nextSeg = nextSeg.key
+    def neighbors(self, seg):
+        i = self.indexOf(seg)
+        segs = self.segs
+        return segs[i - 1] if i > 0 else None, segs[i + 1] if i + 1 < len(segs) else None
 
-        if prevSeg is not None:
-            prevSeg = prevSeg.key
+    def swap(self, seg1, seg2):
+        (i, j) = (self.indexOf(seg1), self.indexOf(seg2))
+        self.segs[i], self.segs[j] = seg2, seg1
+        seg1.statusNode, seg2.statusNode = j, i
 
-        return nextSeg, prevSeg
+    def rearrange(self, run, newOrder):
+        start = self.indexOf(run[0])
+        self.segs[start:start + len(newOrder)] = newOrder
+        for (i, seg) in enumerate(newOrder, start):
+            seg.statusNode = i
+
+    def __iter__(self):
+        return iter(list(self.segs))
+
+
+"""
+    the line status backends by name (see LineSweep statusBackend)
+"""
+LINE_STATUS_BACKENDS = {
+    'avl': AVLLineStatus,
+    'array': SortedArrayLineStatus,
+}
+
+
+"""
+    the grid units (see Point.snapped) behind the sweep line within which found points are kept (see
+    FoundIntersections)
+"""
+FOUND_POINTS_LAG = 1000
+
+
+class FoundIntersections(object):
+    """
+        Intersection points already pushed into the event queue, kept as snapped grid keys (see
+        Point.snapped) in hash sets grouped by their x key, so a lookup costs no point comparisons.
+        The computed points of near-concurrent segments may be found a little after the sweep line
+        passed them (their events are then handled late, see LineSweep.checkIntersection), so the
+        points are kept until they are lag grid units behind the sweep line, and evicted then.
+        The size is therefore bounded by the pending intersection events and the points of the last
+        lag units rather than by all the intersections found
+    """
+
+    def __init__(self, precision=PRECISION, lag=FOUND_POINTS_LAG):
+        self.precision = precision
+        self.lag = lag
+        self.keysByX = {}
+        self.xHeap = []
+        self.sweepX = None
+        self.size = 0
+        self.peakSize = 0
 
-    def adjIntersections(self, seg):
+    def contains(self, point):
+        """
+            returns true iff point was already found, or lies further behind the sweep line than the points
+            kept (see advance)
+        """
+        (x, y) = point.snapped(self.precision)
+        if self.sweepX is not None and x < self.sweepX - self.lag:
+            return True
+        keys = self.keysByX.get(x)
+        return keys is not None and y in keys
+
+    def insert(self, point):
+        (x, y) = point.snapped(self.precision)
+        keys = self.keysByX.get(x)
+        if keys is None:
+            keys = self.keysByX[x] = set()
+            heapq.heappush(self.xHeap, x)
+        elif y in keys:
+            return
+        keys.add(y)
+        self.size += 1
+        if self.size > self.peakSize:
+            self.peakSize = self.size
+
+    def advance(self, x):
         """
-            Given a segment in self line status, returns the intersections of the segments with
-            its adjacent segments (if exist, otherwise None)
+            moves the sweep line to x and evicts the points more than lag grid units left of it
         """
-        nextSeg, prevSeg = self.adjSeg(seg)
+        self.sweepX = snap(x, self.precision)
+        while self.xHeap and self.xHeap[0] < self.sweepX - self.lag:
+            # an x forgotten (see forget) or found again may be in the heap more than once
+            self.size -= len(self.keysByX.pop(heapq.heappop(self.xHeap), ()))
 
-        if nextSeg is not None:
-            interNext = seg.intersectsWith(nextSeg)
-        else:
-            interNext = None
+    def isBehind(self, point):
+        """
+            returns true iff point lies left of the grid column (see Point.snapped) of the sweep line
+        """
+        return self.sweepX is not None and snap(point.x, self.precision) < self.sweepX
 
-        if prevSeg is not None:
-            interPrev = seg.intersectsWith(prevSeg)
-        else:
-            interPrev = None
+    def isAhead(self, point):
+        """
+            returns true iff point lies right of the grid column of the sweep line
+        """
+        return self.sweepX is None or snap(point.x, self.precision) > self.sweepX
 
-        return (interPrev, prevSeg), (interNext, nextSeg)
+    def forget(self, point):
+        """
+            removes a point ahead of the sweep line, e.g. one whose event was moved out of memory: it may be
+            found again and pushed once more, which only costs the duplicate event
+        """
+        (x, y) = point.snapped(self.precision)
+        keys = self.keysByX.get(x)
+        if keys is not None and y in keys:
+            keys.remove(y)
+            self.size -= 1
+            if not keys:
+                del self.keysByX[x]
 
 
 class LineSweep(object):
-    def __init__(self, segmentsSet):
-        self.eventsQueue = EventQueue(segmentsSet)
-        self.lineStatus = LineStatus()
+    def __init__(self, segmentsSet, precision=PRECISION, xRange=None, stats=None, onEvent=None,
+                 statusBackend='avl'):
+        """
+            precision- the number of decimal digits up to which two intersection points are the same point
+            (see checkPrecision)
+            xRange- if given, (fromX, toX): only the slab fromX <= x < toX is swept and only the intersection
+            points in it are counted, so the counts of slabs covering the x axis add up to the whole count
+            stats- if given, a SweepStats the counters of the sweep are collected into. Without it nothing
+            is counted or timed
+            onEvent- if given, called with (point, event type, segment, other segment or None) for every event
+            statusBackend- the name of the line status backend (see LINE_STATUS_BACKENDS): 'avl', or 'array'
+            which is faster for line statuses of moderate size
+        """
+        checkPrecision(precision)
+        start = time.perf_counter()
+        (fromX, self.toX) = xRange or (None, None)
+        self.stats = stats
+        self.onEvent = onEvent
+        if not isinstance(segmentsSet, SegmentStore):
+            segmentsSet = SegmentList(segmentsSet)
+            for seg in segmentsSet:
+                # the segments may have been swept before, at another precision
+                seg.setLastVisitedPoint(seg.startPoint)
+                seg.sweepX = None
+        # the segments by id (for a list input, the id of a segment is its index in the input)
+        self.segments = segmentsSet
+        self.foundIntersections = FoundIntersections(precision)
+        self.eventsQueue = self.buildEventQueue(segmentsSet, fromX)
+        self.lineStatus = LINE_STATUS_BACKENDS[statusBackend](stats)
         self.numOfIntersections = 0
-        self.foundIntersections = AVL()
-
-    def processAdjIntersections(self, seg):
+        # adjacent pairs to swap, see checkIntersection
+        self.missedPairs = []
+        if fromX is not None:
+            self.enterSlab(segmentsSet, fromX)
+        if stats is not None:
+            stats.seconds['build'] += time.perf_counter() - start
+
+    def buildEventQueue(self, segmentsSet, fromX):
         """
-            given a segment in the line status, inserts into event queue the intersection points of the
-            segment with the adjacent segments (if exist)
+            returns the event queue of the sweep, an EventQueue in memory (see ExternalSweep for another one)
         """
-        ((intersectionPrev, prevSeg), (intersectionNext, nextSeg)) = self.lineStatus.adjIntersections(seg)
-        if intersectionPrev is not None and self.foundIntersections.find(intersectionPrev) is None:
-            self.eventsQueue.pushIntersectionEvent(intersectionPrev, lowerSeg=prevSeg, upperSeg=seg)
-            self.foundIntersections.insert(intersectionPrev)
-        if intersectionNext is not None and self.foundIntersections.find(intersectionNext) is None:
-            self.eventsQueue.pushIntersectionEvent(intersectionNext, upperSeg=seg, lowerSeg=nextSeg)
-            self.foundIntersections.insert(intersectionNext)
+        return EventQueue(segmentsSet, fromX)
 
-    def run(self):
+    @classmethod
+    def fromCoordinates(cls, coordinates, precision=PRECISION):
         """
-            This method runs the whole algorithm
-
+            builds the sweep straight from a flat coordinate block, kept as a SegmentStore
         """
-        while not self.eventsQueue.isEmpty():
-            (point, eventType, segList) = self.eventsQueue.popEvent().getData()  # get the next eventQ item
+        return cls(SegmentStore(coordinates), precision)
 
-            if eventType == EventType.START_POINT:
-                [seg] = segList  # it is a start point so only one segment is relevant
+    def enterSlab(self, segmentsSet, fromX):
+        """
+            starts the sweep line at fromX: the segments crossing it are inserted into the line status as if
+            they were clipped there, and their adjacent pairs are tested for intersections right of it
+        """
+        self.foundIntersections.advance(fromX)
+        for id in range(len(segmentsSet)):
+            if segmentsSet.endPointX(2 * id) < fromX <= segmentsSet.endPointX(2 * id + 1):
+                seg = segmentsSet.open(id)
+                seg.precision = self.foundIntersections.precision
+                seg.setLastVisitedPoint(Point(fromX, seg.calcYValueByX(fromX)))
                 self.lineStatus.insert(seg)
-                self.processAdjIntersections(seg)
-
-            elif eventType == EventType.END_POINT:
-                [seg] = segList
-                nextSeg, prevSeg = self.lineStatus.adjSeg(seg)
-                self.lineStatus.remove(seg)
-                if nextSeg is not None and prevSeg is not None:
-                    intersection = nextSeg.intersectsWith(prevSeg)
-                    if intersection is not None and self.foundIntersections.find(intersection) is None:
-                        self.eventsQueue.pushIntersectionEvent(intersection, nextSeg, prevSeg)
-                        self.foundIntersections.insert(intersection)
-
-            elif eventType == EventType.INTERSECTION:
-                self.numOfIntersections += 1
-                [upperSeg, lowerSeg] = segList  # it is an intersection point so two segments are relevant
 
-                # swap the segments in the line status by removing them, updating their last visited point
-                # and inserting them back
-                self.lineStatus.remove(upperSeg)
-                self.lineStatus.remove(lowerSeg)
-                upperSeg.setLastVisitedPoint(point)
-                lowerSeg.setLastVisitedPoint(point)
-                self.lineStatus.insert(upperSeg)
-                self.lineStatus.insert(lowerSeg)
+        segs = list(self.lineStatus)
+        for (lowerSeg, upperSeg) in zip(segs, segs[1:]):
+            self.checkIntersection(lowerSeg, upperSeg)
+        self.swapMissedPairs()
+
+    def checkIntersection(self, lowerSeg, upperSeg):
+        """
+            given two adjacent segments of the line status (or None), inserts into event queue their
+            intersection point if it was not found yet.
+            A point behind the sweep line was handled already if the pair is in its order past the point (see
+            reorderRun). If it is still in its order before it, the crossing was missed (the computed points of
+            near-concurrent segments are out of order by their rounding): a point not found yet is pushed and
+            handled late. A pair meeting at a point found already, on the grid column of the sweep line or
+            behind it, is swapped instead (see missedPairs): the point is handled, or about to be, without it
+        """
+        if lowerSeg is None or upperSeg is None:
+            return
+        intersection = Segment.pairIntersection(lowerSeg, upperSeg)
+        if self.stats is not None:
+            self.stats.intersectionTests += 1
+        if intersection is None:
+            return
+        found = self.foundIntersections
+        if lowerSeg.slope <= upperSeg.slope and found.isBehind(intersection):
+            if self.stats is not None:
+                self.stats.intersectionHits += 1
+                self.stats.dedupHits += 1
+            return
+        if lowerSeg.slope > upperSeg.slope and not found.isAhead(intersection) and found.contains(intersection):
+            self.missedPairs.append((lowerSeg, upperSeg))
+            return
+        self.pushIntersection(intersection, upperSeg, lowerSeg)
+
+    def swapMissedPairs(self):
+        """
+            swaps the adjacent pairs found crossed at points handled without them (see checkIntersection),
+            once the runs of the current point are re-sorted, and tests their new neighbors
+        """
+        while self.missedPairs:
+            (lowerSeg, upperSeg) = self.missedPairs.pop()
+            if lowerSeg.statusNode is None or upperSeg.statusNode is None or \
+                    self.lineStatus.above(lowerSeg) is not upperSeg:
+                continue
+            (below, above) = (self.lineStatus.below(lowerSeg), self.lineStatus.above(upperSeg))
+            self.lineStatus.swap(lowerSeg, upperSeg)
+            self.checkIntersection(below, upperSeg)
+            self.checkIntersection(lowerSeg, above)
+
+    def pushIntersection(self, intersection, upperSeg, lowerSeg):
+        """
+            inserts into event queue the intersection point of the two segments if it was not found yet
+        """
+        known = self.foundIntersections.contains(intersection)
+        if self.stats is not None:
+            self.stats.intersectionHits += 1
+            self.stats.dedupHits += known
+        if not known:
+            self.eventsQueue.pushIntersectionEvent(intersection, upperSeg, lowerSeg)
+            self.foundIntersections.insert(intersection)
+
+    def checkRun(self, point, run):
+        """
+            given a run through point, pushes the intersections of its non-adjacent segments that
+            meet elsewhere: near-concurrent segments, each meeting its neighbors at the point but not each
+            other. The run is re-sorted past them all at once, so they would not be adjacent again
+        """
+        precision = self.foundIntersections.precision
+        key = point.snapped(precision)
+        for (i, lowerSeg) in enumerate(run):
+            for upperSeg in run[i + 2:]:
+                intersection = Segment.pairIntersection(lowerSeg, upperSeg)
+                if intersection is not None and intersection.snapped(precision) != key:
+                    self.pushIntersection(intersection, upperSeg, lowerSeg)
+
+    @staticmethod
+    def intersectingPairs(point, segs, precision=PRECISION):
+        """
+            given the segments meeting at point, yields the pairs of them intersecting at point: the pairs whose
+            pairwise test from the segment starting first reports point (see Segment.intersectsAt), as between
+            all the pairs. So an overlap counts once, where it starts
+        """
+        key = point.snapped(precision)
+        for (i, seg) in enumerate(segs):
+            for otherSeg in segs[i + 1:]:
+                if seg.intersectsAt(otherSeg, key, precision):
+                    yield seg, otherSeg
+
+    @staticmethod
+    def isIntersection(point, segs, precision=PRECISION):
+        """
+            given the segments meeting at point, returns true iff point counts as an intersection point
+            (see intersectingPairs)
+        """
+        return next(LineSweep.intersectingPairs(point, segs, precision), None) is not None
 
-                self.processAdjIntersections(upperSeg)
-                self.processAdjIntersections(lowerSeg)
+    def processPoint(self, point, startSegs, endSegs, crossingSegs, reported=None):
+        """
+            handles all the events at one point together: inserts the segments starting at it, re-sorts the
+            whole run of segments passing through it at once, removes the ones ending at it and tests only
+            the two new boundary pairs of the run for intersections.
+            reported- if given, a list the (point, segment, other segment) of the pairs intersecting at the
+            point are appended to
+        """
+        precision = self.foundIntersections.precision
+        for seg in startSegs:
+            # the segments are ordered up to the precision of the sweep (see Segment.__lt__)
+            seg.precision = precision
+            self.lineStatus.insert(seg)
+
+        runs = []
+        visited = set()
+        for seg in startSegs + endSegs + crossingSegs:
+            if seg not in visited:
+                run = self.lineStatus.runThrough(point, seg, precision)
+                # the runs from two segments may overlap (a segment may meet the other run only), they are merged
+                overlapping = [other for other in runs if other[0] in run or run[0] in other]
+                while overlapping:
+                    other = overlapping.pop()
+                    runs.remove(other)
+                    (lower, upper) = (run, other) if other[0] in run else (other, run)
+                    run = lower + [runSeg for runSeg in upper if runSeg not in lower]
+                    overlapping = [other for other in runs if other[0] in run or run[0] in other]
+                for runSeg in run:
+                    runSeg.setLastVisitedPoint(point)
+                visited.update(run)
+                runs.append(run)
+        meeting = [seg for run in runs for seg in run]
+
+        if reported is None:
+            # every segment of a run meets another one of it at the point (see runThrough)
+            if any(len(run) > 1 for run in runs) or LineSweep.isIntersection(point, meeting, precision):
+                self.numOfIntersections += 1
+        else:
+            pairs = [(point, seg, otherSeg)
+                     for (seg, otherSeg) in LineSweep.intersectingPairs(point, meeting, precision)]
+            if pairs:
+                self.numOfIntersections += 1
+                reported += pairs
+
+        endSegs = set(endSegs)
+        for run in runs:
+            # segments all passing exactly through the point meet nowhere else, so only a run of near-concurrent
+            # ones is searched, not every point of high degree
+            if len(run) > 2 and not all(seg.passesThrough(point) for seg in run):
+                self.checkRun(point, run)
+            below = self.lineStatus.below(run[0])
+            above = self.lineStatus.above(run[-1])
+            continuing = self.lineStatus.reorderRun(run, endSegs)
+            if continuing:
+                self.checkIntersection(below, continuing[0])
+                self.checkIntersection(continuing[-1], above)
+            else:
+                self.checkIntersection(below, above)
+        self.swapMissedPairs()
 
+    def run(self):
+        """
+            This method runs the whole algorithm and counts the intersection points (see getResult)
+        """
+        for _ in self.sweep():
+            pass
         return self
 
+    def sweep(self, reported=None):
+        """
+            runs the algorithm: the events are drained one x at a time and handled one point at a time,
+            bottom up. A generator yielding after every x, when reported (see processPoint) holds the
+            intersections found at it
+        """
+        stats = self.stats
+        onEvent = self.onEvent
+        while not self.eventsQueue.isEmpty():
+            x = self.eventsQueue.nextX()
+            if self.toX is not None and x >= self.toX:
+                break
+            if stats is not None:
+                start = time.perf_counter()
+            self.foundIntersections.advance(x)
+
+            eventsByPoint = {}
+            while not self.eventsQueue.isEmpty() and self.eventsQueue.nextX() == x:
+                (point, eventType, seg, otherSeg) = self.eventsQueue.popEvent()  # get the next eventQ item
+                if stats is not None:
+                    stats.events[eventType] += 1
+                if onEvent is not None:
+                    onEvent(point, eventType, seg, otherSeg)
+                key = point.snapped(self.foundIntersections.precision)
+                if key not in eventsByPoint:
+                    eventsByPoint[key] = (point, [], [], [])
+                (_, startSegs, endSegs, crossingSegs) = eventsByPoint[key]
+
+                if eventType == EventType.START_POINT:
+                    startSegs.append(seg)
+                elif eventType == EventType.END_POINT:
+                    endSegs.append(seg)
+                elif eventType == EventType.INTERSECTION:
+                    # it is an intersection point so two segments are relevant
+                    crossingSegs.append(seg)
+                    crossingSegs.append(otherSeg)
+
+            points = [eventsByPoint[key] for key in sorted(eventsByPoint)]
+            # every point of this x is handled now, it must not be pushed again as an intersection
+            for (point, _, _, _) in points:
+                self.foundIntersections.insert(point)
+            if stats is not None:
+                drained = time.perf_counter()
+                stats.seconds['events'] += drained - start
+            for (point, startSegs, endSegs, crossingSegs) in points:
+                self.processPoint(point, startSegs, endSegs, crossingSegs, reported)
+            if stats is not None:
+                stats.seconds['points'] += time.perf_counter() - drained
+            yield x
+
+        if stats is not None:
+            stats.heapPushes += self.eventsQueue.pushCount
+            stats.heapPops += stats.events[EventType.INTERSECTION]
+
+    def iterIntersections(self):
+        """
+            runs the algorithm, yielding every intersection as soon as the sweep line passes it:
+            (point, segment id, other segment id) for every pair of segments intersecting at the point,
+            the ids of self.segments (the smaller first), the points from left to right.
+            Only the intersections at the current x are held, and getResult() is the count afterwards
+        """
+        reported = []
+        for _ in self.sweep(reported):
+            for (point, seg, otherSeg) in reported:
+                (i, j) = (seg.id, otherSeg.id)
+                yield (point, i, j) if i < j else (point, j, i)
+            del reported[:]
+
+    def iterIntersectionBatches(self, batchSize=65536):
+        """
+            iterIntersections in batches for bulk writes: yields (points, ids), NumPy arrays of up to batchSize
+            rows, the float64 x and y of the points and the int64 ids of the pairs
+        """
+        if np is None:
+            raise ImportError("intersection batches require numpy")
+        (points, ids) = ([], [])
+        for (point, i, j) in self.iterIntersections():
+            points.append((point.x, point.y))
+            ids.append((i, j))
+            if len(ids) == batchSize:
+                yield np.array(points, dtype=np.float64), np.array(ids, dtype=np.int64)
+                (points, ids) = ([], [])
+        if ids:
+            yield np.array(points, dtype=np.float64), np.array(ids, dtype=np.int64)
+
     def getResult(self):
         return self.numOfIntersections
+
+    def getPeakFoundIntersections(self):
+        """
+            returns the largest number of intersection points kept for deduplication at once
+        """
+        return self.foundIntersections.peakSize
@@ -0,0 +1,96 @@
+import collections
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from GeometricAux import *
+from Engines import countIntersections
+from LineSweep import LineSweep
+
+
+def countBlock(payload):
+    """
+        worker side: given the bytes of a coordinate block, returns its number of intersections
+    """
+    coordinates = array('d')
+    coordinates.frombytes(payload)
+    return countIntersections(segmentsFromCoordinates(coordinates))
+
+
+def countInParallel(coordinateBlocks, processes=None, maxInFlight=None):
+    """
+        given an iterable of (i, coordinate block) such as Parser.iterCoordinateBlocks() or a
+        BinaryFormat.SegmentSets, counts the intersections of the test cases in a pool of processes and
+        yields (i, result) in the original order.
+        The blocks are sent to the workers as raw float64 bytes rather than pickled segments, and at most
+        maxInFlight test cases (default: twice the processes) are read and queued at once.
+        processes- the size of the pool, default: the number of cores
+    """
+    processes = processes or os.cpu_count() or 1
+    maxInFlight = maxInFlight or 2 * processes
+    inFlight = collections.deque()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for (numOfTestCase, coordinates) in coordinateBlocks:
+            if len(inFlight) == maxInFlight:
+                (doneTestCase, future) = inFlight.popleft()
+                yield doneTestCase, future.result()
+            inFlight.append((numOfTestCase, pool.submit(countBlock, coordinates.tobytes())))
+        while inFlight:
+            (doneTestCase, future) = inFlight.popleft()
+            yield doneTestCase, future.result()
+
+
+def slabBoundaries(coordinates, numOfSlabs):
+    """
+        given a flat coordinate block, returns the x values splitting its end-points into numOfSlabs
+        groups of about the same size (fewer if end-points share x values)
+    """
+    values = coordinates.tolist()
+    xs = sorted(values[0::2])
+    boundaries = []
+    for i in range(1, numOfSlabs):
+        x = xs[i * len(xs) // numOfSlabs]
+        if x > xs[0] and (not boundaries or x > boundaries[-1]):
+            boundaries.append(x)
+    return boundaries
+
+
+def slabBlock(values, fromX, toX):
+    """
+        given the coordinates of a block as a list, returns as raw float64 bytes the coordinate block of the
+        segments meeting the slab fromX <= x < toX (None for no bound)
+    """
+    selected = array('d')
+    for i in range(0, len(values), 4):
+        (x1, x2) = (values[i], values[i + 2])
+        (startX, endX) = (x1, x2) if x1 <= x2 else (x2, x1)
+        if (fromX is None or endX >= fromX) and (toX is None or startX < toX):
+            selected.extend(values[i:i + 4])
+    return selected.tobytes()
+
+
+def countSlab(payload, fromX, toX):
+    """
+        worker side: given the bytes of a coordinate block, returns its number of intersections in the slab
+    """
+    coordinates = array('d')
+    coordinates.frombytes(payload)
+    return LineSweep(SegmentStore(coordinates), xRange=(fromX, toX)).run().getResult()
+
+
+def countBySlabs(coordinates, numOfSlabs=None, processes=None):
+    """
+        counts the intersections of one big coordinate block by splitting the x axis into vertical slabs at
+        end-point quantiles and sweeping every slab in a pool of processes. A slab gets only the segments
+        meeting it, and the segments crossing its left boundary enter its sweep there (see LineSweep xRange).
+        Every intersection point is counted by the one slab its x falls in, the slab starting at it if it
+        lies on a boundary, so the sum equals the count of a single sweep.
+        numOfSlabs- default: the size of the pool. processes- default: the number of cores
+    """
+    processes = processes or os.cpu_count() or 1
+    boundaries = slabBoundaries(coordinates, numOfSlabs or processes)
+    slabs = list(zip([None] + boundaries, boundaries + [None]))
+    values = coordinates.tolist()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(countSlab, slabBlock(values, fromX, toX), fromX, toX) for (fromX, toX) in slabs]
+        return sum(future.result() for future in futures)
+
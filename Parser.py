@@ -1,26 +1,60 @@
+import mmap
+from array import array
 from GeometricAux import *
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def parseCoordinates(text):
+    """
+        given the text of a block of segment lines, returns all its numbers as one flat float64 array
+        (4 numbers per segment: x1 y1 x2 y2), parsed in a single call
+    """
+    if np is not None:
+        return np.fromstring(text, dtype=np.float64, sep=' ')
+    return array('d', map(float, text.split()))
+
 
 class Parser(object):
     """
         This class is responsible for transforming the given input file to
         a set of entries {i -> setOfSegments(i)} , for i=0,1,..
+        The file is memory-mapped and read one test case at a time: iterating over the parser
+        yields the entries lazily, so only the current test case is held in memory
     """
     def __init__(self, fileDir):
+        self.fileDir = fileDir
+        self.testCases = None
 
-        self.testCases = {}
+    def iterCoordinateBlocks(self):
+        """
+            yields (i, coordinate block of test case i) for i=0,1,.. (see parseCoordinates)
+        """
+        with open(self.fileDir, 'rb') as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                numOfSets = int(data.readline())
+                for numOfTestCase in range(numOfSets):
+                    numOfSeg = int(data.readline())
+                    start = end = data.tell()
+                    for _ in range(numOfSeg):
+                        end = data.find(b'\n', end) + 1
+                        if end == 0:  # the last line has no newline
+                            end = len(data)
+                            break
+                    data.seek(end)
+                    yield numOfTestCase, parseCoordinates(data[start:end])
 
-        with open(fileDir) as file:
-            numOfSets = int(file.readline().strip(' '))
-            for numOfTestCase in range(numOfSets):
-                numOfSeg = int(file.readline().strip(' '))
-                setOfSegments = set()
-                for _ in range(numOfSeg):
-                    points = [float(num) for num in file.readline().split(' ')]
-                    segment = Segment(Point(points[0], points[1]), Point(points[2], points[3]))
-                    setOfSegments.add(segment)
-                self.testCases[numOfTestCase] = setOfSegments
+    def __iter__(self):
+        """
+            yields (i, setOfSegments(i)) for i=0,1,..
+        """
+        for (numOfTestCase, coordinates) in self.iterCoordinateBlocks():
+            yield numOfTestCase, segmentsFromCoordinates(coordinates)
 
     def getResult(self):
+        if self.testCases is None:
+            self.testCases = dict(iter(self))
         return self.testCases
-
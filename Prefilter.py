@@ -0,0 +1,91 @@
+import math
+import statistics
+from GeometricAux import *
+
+
+def cellsAlong(seg, cellSize):
+    """
+        yields the cells of a grid of side cellSize the segment passes through, widened by the tolerance of
+        computed points: about its length over cellSize cells, however long and steep it is
+    """
+    margin = 10 ** -(PRECISION - 1)
+    (startX, endX) = (seg.startPoint.x - margin, seg.endPoint.x + margin)
+    for column in range(math.floor(startX / cellSize), math.floor(endX / cellSize) + 1):
+        # the part of the segment in the column, its y range is between its y values at the ends
+        fromX = max(startX, column * cellSize)
+        toX = min(endX, (column + 1) * cellSize)
+        (lowY, highY) = sorted((seg.lineSlope * fromX + seg.lineIntercept,
+                                seg.lineSlope * toX + seg.lineIntercept))
+        for row in range(math.floor((lowY - margin) / cellSize), math.floor((highY + margin) / cellSize) + 1):
+            yield column, row
+
+
+class GridPrefilter(object):
+    """
+        Buckets the segments into a uniform grid by the cells they pass through (see cellsAlong). Two
+        intersecting segments share a cell (the one holding their intersection point), so a segment sharing
+        no cell with another segment intersects nothing and is dropped, and the others are split into
+        clusters of segments connected by shared cells. No intersection point is shared by two clusters, so
+        the sum of the clusters' counts is the count of the whole set
+    """
+
+    def __init__(self, segmentsSet, cellSize=None):
+        """
+            cellSize- the side of a grid cell, default: adapted to the segments (see adaptiveCellSize)
+        """
+        self.segments = list(segmentsSet)
+        self.cellSize = cellSize or GridPrefilter.adaptiveCellSize(self.segments)
+        self.clusters = self.buildClusters() if self.segments else []
+        self.numOfDropped = len(self.segments) - sum(len(cluster) for cluster in self.clusters)
+
+    @staticmethod
+    def adaptiveCellSize(segments):
+        """
+            half the median side of the segments' bounding boxes: a typical segment passes through about 3
+            cells, small enough for segments passing by each other to share few cells. The median is not set
+            by a few long segments, which only pass through more cells.
+            The grid is kept as a dictionary of the non-empty cells, so empty space costs nothing
+        """
+        if not segments:
+            return 1.0
+        medianSide = statistics.median(
+            (seg.endPoint.x - seg.startPoint.x + abs(seg.endPoint.y - seg.startPoint.y)) / 2 for seg in segments)
+        return max(medianSide / 2, 10 ** -PRECISION)
+
+    def buildClusters(self):
+        """
+            returns the lists of segments connected by shared cells, leaving out the lone segments
+        """
+        parent = list(range(len(self.segments)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        firstInCell = {}
+        shared = [False] * len(self.segments)
+        for (i, seg) in enumerate(self.segments):
+            for cell in cellsAlong(seg, self.cellSize):
+                j = firstInCell.setdefault(cell, i)
+                if j != i:
+                    shared[i] = shared[j] = True
+                    parent[find(i)] = find(j)
+
+        clusters = {}
+        for (i, seg) in enumerate(self.segments):
+            if shared[i]:
+                clusters.setdefault(find(i), []).append(seg)
+        return list(clusters.values())
+
+    def eliminatedFraction(self):
+        """
+            returns the fraction of the segments dropped without being swept
+        """
+        return self.numOfDropped / len(self.segments) if self.segments else 0.0
+
+    def __str__(self):
+        return "{0} of {1} segments dropped ({2:.1%}), {3} clusters, the biggest of {4} segments".format(
+            self.numOfDropped, len(self.segments), self.eliminatedFraction(), len(self.clusters),
+            max((len(cluster) for cluster in self.clusters), default=0))
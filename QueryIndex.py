@@ -0,0 +1,67 @@
+from GeometricAux import *
+from Prefilter import GridPrefilter, cellsAlong
+
+
+class SegmentIndex(object):
+    """
+        A static index of a base set of segments, built once, answering which base segments a query segment
+        intersects, with the semantics of Segment.intersectsWith: the same predicate the sweep tests its
+        neighbouring segments with, so a query is answered as if swept with the base set.
+        Like GridPrefilter, the segments are bucketed into a uniform grid kept as a dictionary of the
+        non-empty cells, a segment listed in the cells it passes through (column by column). A query tests
+        only the base segments sharing a cell with it, so its cost is the number of cells it passes through
+        and of segments in them, not the size of the base set
+    """
+
+    def __init__(self, segments, cellSize=None):
+        """
+            segments- the base segments, their ids are their indices in this sequence
+            cellSize- the side of a grid cell, default: adapted to the segments (see GridPrefilter)
+        """
+        self.segments = list(segments)
+        self.cellSize = cellSize or GridPrefilter.adaptiveCellSize(self.segments)
+        self.cells = {}
+        for (id, seg) in enumerate(self.segments):
+            for cell in self.cellsAlong(seg):
+                self.cells.setdefault(cell, []).append(id)
+
+    def cellsAlong(self, seg):
+        """
+            yields the cells the segment passes through (see Prefilter.cellsAlong)
+        """
+        return cellsAlong(seg, self.cellSize)
+
+    def candidates(self, query):
+        """
+            returns the ids of the base segments sharing a cell with query
+        """
+        ids = set()
+        for cell in self.cellsAlong(query):
+            ids.update(self.cells.get(cell, ()))
+        return ids
+
+    def report(self, query):
+        """
+            returns the list of (id, intersection point) of the base segments query intersects, by id.
+            Like the pairwise test of the sweep, a pair is tested from the segment starting first (see
+            Segment.pairIntersection), so the point of overlapping segments is where their overlap starts
+        """
+        intersections = []
+        for id in sorted(self.candidates(query)):
+            seg = self.segments[id]
+            intersection = Segment.pairIntersection(query, seg)
+            if intersection is not None:
+                intersections.append((id, intersection))
+        return intersections
+
+    def count(self, query):
+        """
+            returns the number of base segments query intersects
+        """
+        return len(self.report(query))
+
+    def reportBatch(self, queries):
+        return [self.report(query) for query in queries]
+
+    def countBatch(self, queries):
+        return [self.count(query) for query in queries]
@@ -0,0 +1,79 @@
+from GeometricAux import *
+from LineSweep import LineSweep
+from QueryIndex import SegmentIndex
+
+
+def isInternallyNonCrossing(segments, precision=PRECISION):
+    """
+        returns True if no two of the segments cross: they may only meet where one of them ends, like the
+        edges of a map. The sweep stops at the first crossing, and until then it only meets end-points, so
+        this takes O(n log n) whatever the number of crossings
+    """
+    segments = list(segments)
+    for (point, i, j) in LineSweep(segments, precision).iterIntersections():
+        key = point.snapped(precision)
+        if all(key not in (seg.startPoint.snapped(precision), seg.endPoint.snapped(precision))
+               for seg in (segments[i], segments[j])):
+            return False
+    return True
+
+
+class RedBlueSweep(object):
+    """
+        Counts and reports only the intersections between a red and a blue segment set (e.g. two map
+        layers), not those within a set: the number of distinct points where a red and a blue segment meet.
+        If neither set crosses itself, the two are swept together: the only intersection events are then
+        the red-blue crossings, so the sweep costs O((n + k) log n) for the k red-blue points, the bound of
+        the dedicated red-blue algorithms. Otherwise, so that the crossings within a set are never computed,
+        the blue set is indexed (see QueryIndex.SegmentIndex) and queried with every red segment.
+        Red segments are numbered 0..len(red)-1 and blue ones 0..len(blue)-1, in the order given
+    """
+
+    def __init__(self, redSegments, blueSegments, precision=PRECISION, method=None):
+        """
+            method- 'sweep' or 'index', default: 'sweep' if neither set crosses itself (see
+                    isInternallyNonCrossing), otherwise 'index'
+        """
+        checkPrecision(precision)
+        self.red = list(redSegments)
+        self.blue = list(blueSegments)
+        self.precision = precision
+        for seg in self.red + self.blue:
+            # the points are rounded to the precision (see Segment.getIntersectionPoint)
+            seg.precision = precision
+        if method is None:
+            method = 'sweep' if isInternallyNonCrossing(self.red, precision) and \
+                                isInternallyNonCrossing(self.blue, precision) else 'index'
+        if method not in ('sweep', 'index'):
+            raise ValueError("unknown red-blue method: {0}".format(method))
+        self.method = method
+        self.numOfIntersections = 0
+
+    def iterIntersections(self):
+        """
+            yields (point, red id, blue id) for every pair of a red and a blue segment intersecting at the
+            point; getResult() is the number of distinct points afterwards
+        """
+        keys = set()
+        if self.method == 'sweep':
+            numOfRed = len(self.red)
+            for (point, i, j) in LineSweep(self.red + self.blue, self.precision).iterIntersections():
+                # i < j, so a red-blue pair has the red one first
+                if i < numOfRed <= j:
+                    keys.add(point.snapped(self.precision))
+                    yield point, i, j - numOfRed
+        else:
+            index = SegmentIndex(self.blue)
+            for (i, seg) in enumerate(self.red):
+                for (j, point) in index.report(seg):
+                    keys.add(point.snapped(self.precision))
+                    yield point, i, j
+        self.numOfIntersections = len(keys)
+
+    def run(self):
+        for _ in self.iterIntersections():
+            pass
+        return self
+
+    def getResult(self):
+        return self.numOfIntersections
@@ -0,0 +1,146 @@
+"""
+    Seeded generators of synthetic segment sets for benchmarks: every generator takes the number of
+    segments and a seed and returns a list of segments (no vertical ones), the same for the same seed
+"""
+import math
+import random
+from GeometricAux import *
+
+
+def randomSegments(numOfSegments, maxLength, seed=0):
+    """
+        segments starting uniformly in a 1000 x 1000 square, of x extent 1..maxLength and y extent up to
+        maxLength, coordinates rounded to one decimal digit. The number of intersections grows with maxLength
+    """
+    rng = random.Random(seed)
+    segments = []
+    for _ in range(numOfSegments):
+        x = rng.uniform(0, 1000)
+        y = rng.uniform(0, 1000)
+        segments.append(Segment(Point(round(x, 1), round(y, 1)),
+                                Point(round(x + rng.uniform(1, maxLength), 1),
+                                      round(y + rng.uniform(-maxLength, maxLength), 1))))
+    return segments
+
+
+def sparseSegments(numOfSegments, seed=0):
+    return randomSegments(numOfSegments, 20, seed)
+
+
+def denseSegments(numOfSegments, seed=0):
+    return randomSegments(numOfSegments, 300, seed)
+
+
+def gridSegments(numOfSegments, seed=0):
+    """
+        segments between random points of a small integer grid (about sqrt(n) x sqrt(n)), so many of
+        them share end-points, cross at the same points and overlap
+    """
+    rng = random.Random(seed)
+    side = max(3, int(math.sqrt(numOfSegments)))
+    segments = []
+    while len(segments) < numOfSegments:
+        (x1, x2) = (rng.randint(0, side), rng.randint(0, side))
+        if x1 != x2:
+            segments.append(Segment(Point(float(x1), float(rng.randint(0, side))),
+                                    Point(float(x2), float(rng.randint(0, side)))))
+    return segments
+
+
+def starSegments(numOfSegments, seed=0, numOfCenters=4):
+    """
+        segments through a few center points, each center a point of high degree
+    """
+    rng = random.Random(seed)
+    centers = [(rng.uniform(200, 800), rng.uniform(200, 800)) for _ in range(numOfCenters)]
+    segments = []
+    for i in range(numOfSegments):
+        (cx, cy) = centers[i % numOfCenters]
+        angle = rng.uniform(-1.5, 1.5)
+        (left, right) = (rng.uniform(10, 200), rng.uniform(10, 200))
+        (dx, dy) = (math.cos(angle), math.sin(angle))
+        segments.append(Segment(Point(round(cx - left * dx, 3), round(cy - left * dy, 3)),
+                                Point(round(cx + right * dx, 3), round(cy + right * dy, 3))))
+    return segments
+
+
+def concurrentSegments(numOfSegments, seed=0):
+    """
+        segments of integer end-points through a single integer point, in distinct directions: one point
+        of degree n, the worst case of handling the segments meeting at a point
+    """
+    rng = random.Random(seed)
+    directions = set()
+    segments = []
+    while len(segments) < numOfSegments:
+        (dx, dy) = (rng.randint(1, 200), rng.randint(-200, 200))
+        if math.gcd(dx, dy) == 1 and (dx, dy) not in directions:
+            directions.add((dx, dy))
+            (left, right) = (rng.randint(1, 4), rng.randint(1, 4))
+            segments.append(Segment(Point(float(1000 - left * dx), float(1000 - left * dy)),
+                                    Point(float(1000 + right * dx), float(1000 + right * dy))))
+    return segments
+
+
+def nearParallelSegments(numOfSegments, seed=0):
+    """
+        a bundle of long segments of almost the same slope, close to each other: few crossings, at
+        shallow angles, and near-ties of the line status order all along the sweep
+    """
+    rng = random.Random(seed)
+    segments = []
+    for i in range(numOfSegments):
+        y = i * 0.01 + rng.uniform(0, 0.005)
+        slope = 0.5 + rng.uniform(-1e-4, 1e-4)
+        x1 = rng.uniform(0, 10)
+        x2 = rng.uniform(990, 1000)
+        segments.append(Segment(Point(x1, y + slope * x1), Point(x2, y + slope * x2)))
+    return segments
+
+
+def mixedSegments(numOfSegments, seed=0):
+    """
+        dense clusters of short segments scattered in empty space, crossed by a few long segments
+    """
+    rng = random.Random(seed)
+    numOfLong = max(1, numOfSegments // 50)
+    clusters = [(rng.uniform(0, 1000), rng.uniform(0, 1000)) for _ in range(max(1, numOfSegments // 100))]
+    segments = []
+    for _ in range(numOfSegments - numOfLong):
+        (cx, cy) = rng.choice(clusters)
+        x = cx + rng.uniform(-10, 10)
+        y = cy + rng.uniform(-10, 10)
+        segments.append(Segment(Point(round(x, 2), round(y, 2)),
+                                Point(round(x + rng.uniform(1, 8), 2), round(y + rng.uniform(-8, 8), 2))))
+    for _ in range(numOfLong):
+        x = rng.uniform(0, 100)
+        segments.append(Segment(Point(round(x, 2), round(rng.uniform(0, 1000), 2)),
+                                Point(round(x + rng.uniform(800, 900), 2), round(rng.uniform(0, 1000), 2))))
+    return segments
+
+
+"""
+    the workloads by name: name -> generator(numOfSegments, seed)
+"""
+WORKLOADS = {
+    'sparse': sparseSegments,
+    'dense': denseSegments,
+    'grid': gridSegments,
+    'star': starSegments,
+    'concurrent': concurrentSegments,
+    'near-parallel': nearParallelSegments,
+    'mixed': mixedSegments,
+}
+
+
+def writeInputFile(fileDir, testCases):
+    """
+        writes the lists of segments testCases as an input file in the format read by Parser
+    """
+    with open(fileDir, 'w') as file:
+        file.write("{0}\n".format(len(testCases)))
+        for segments in testCases:
+            file.write("{0}\n".format(len(segments)))
+            for seg in segments:
+                file.write("{0!r} {1!r} {2!r} {3!r}\n".format(seg.startPoint.x, seg.startPoint.y,
+                                                              seg.endPoint.x, seg.endPoint.y))
@@ -1,12 +1,17 @@
 from Parser import Parser
-from LineSweep import LineSweep
+from Engines import countIntersections
+from Parallel import countInParallel
 
 
 if __name__ == "__main__":
 
     file = "./tests/test1.in"
+    processes = 1  # the number of worker processes running test cases in parallel, None for one per core
 
-    testCases = Parser(file).getResult()
-    for (_, segmentSet) in testCases.items():
-        result = LineSweep(segmentSet).run().getResult()
-        print("{0}".format(result))
+    if processes == 1:
+        for (_, segmentSet) in Parser(file):
+            result = countIntersections(segmentSet)
+            print("{0}".format(result))
+    else:
+        for (_, result) in countInParallel(Parser(file).iterCoordinateBlocks(), processes):
+            print("{0}".format(result))
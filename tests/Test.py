@@ -1,24 +1,224 @@
 from Parser import Parser
 from LineSweep import LineSweep
+from BruteForce import BruteForce, np
+from BinaryFormat import convert, SegmentSets
+from CommonSlab import CommonSlabSweep
+from ExternalSweep import ExternalSweep
+from Engines import countIntersections
+from QueryIndex import SegmentIndex
+from RedBlue import RedBlueSweep
+from Approximate import ApproximateCount
+from Checkpoint import writeSnapshot, runWithCheckpoints, eventsDone
+from Parallel import countBySlabs, countInParallel
+from Workloads import starSegments, gridSegments, sparseSegments, nearParallelSegments
+from GeometricAux import Segment, Point
+from array import array
 import os
+import shutil
+import tempfile
 
 if __name__ == "__main__":
 
+    engines = [LineSweep, CommonSlabSweep] if np is None else [LineSweep, CommonSlabSweep, BruteForce]
+
     for filename in os.listdir(os.getcwd()):
         if filename.endswith(".in"):
             testCases = Parser(filename).getResult()
 
-            actual = ""
             expected = open("test{0}.out".format(filename.split("test")[1].split(".")[0])).read()
 
+            for engine in engines:
+                actual = ""
+                for (_, segmentSet) in testCases.items():
+                    result = engine(segmentSet).run().getResult()
+                    actual += "{0}\n".format(result)
+
+                if actual == expected:
+                    print("{0} passed! ({1})".format(filename, engine.__name__))
+                else:
+                    print("{0} failed! ({1})".format(filename, engine.__name__))
+
+            # the sweep with the sorted array line status
+            actual = "".join("{0}\n".format(LineSweep(segmentSet, statusBackend='array').run().getResult())
+                             for (_, segmentSet) in testCases.items())
+
+            if actual == expected:
+                print("{0} passed! (array status)".format(filename))
+            else:
+                print("{0} failed! (array status)".format(filename))
+
+            # the intersections reported one by one, at distinct points as many as counted
+            actual = ""
+            for (_, segmentSet) in testCases.items():
+                points = {point.snapped() for (point, _, _) in LineSweep(segmentSet).iterIntersections()}
+                actual += "{0}\n".format(len(points))
+
+            if actual == expected:
+                print("{0} passed! (reported)".format(filename))
+            else:
+                print("{0} failed! (reported)".format(filename))
+
+            # the same test cases, through the binary format
+            binaryFileDir = os.path.join(tempfile.mkdtemp(), "test.seg")
+            convert(filename, binaryFileDir)
+            segmentSets = SegmentSets(binaryFileDir)
+            actual = "".join("{0}\n".format(LineSweep.fromCoordinates(segmentSets[i]).run().getResult())
+                             for i in range(len(segmentSets)))
+            segmentSets.close()
+            os.remove(binaryFileDir)
+            os.rmdir(os.path.dirname(binaryFileDir))
+
+            if actual == expected:
+                print("{0} passed! (binary)".format(filename))
+            else:
+                print("{0} failed! (binary)".format(filename))
+
+            # the test cases split into vertical slabs, swept in a pool of processes
+            actual = "".join("{0}\n".format(countBySlabs(coordinates, 4, 2))
+                             for (_, coordinates) in Parser(filename).iterCoordinateBlocks())
+
+            if actual == expected:
+                print("{0} passed! (slabs)".format(filename))
+            else:
+                print("{0} failed! (slabs)".format(filename))
+
+            # the segments split into clusters first (see Prefilter.GridPrefilter), every cluster counted alone
+            actual = "".join("{0}\n".format(countIntersections(segmentSet, prefilter=True))
+                             for (_, segmentSet) in testCases.items())
+
+            if actual == expected:
+                print("{0} passed! (prefilter)".format(filename))
+            else:
+                print("{0} failed! (prefilter)".format(filename))
+
+            # every segment queried against an index of its test case, at distinct points as many as counted
+            actual = ""
             for (_, segmentSet) in testCases.items():
-                result = LineSweep(segmentSet).run().getResult()
-                actual += "{0}\n".format(result)
+                index = SegmentIndex(segmentSet)
+                points = {point.snapped() for (i, seg) in enumerate(segmentSet)
+                          for (j, point) in index.report(seg) if j != i}
+                actual += "{0}\n".format(len(points))
 
             if actual == expected:
-                print("{0} passed!".format(filename))
+                print("{0} passed! (query index)".format(filename))
             else:
-                print("{0} failed!".format(filename))
+                print("{0} failed! (query index)".format(filename))
+
+            # every test case split into a red and a blue half: the points within each half and the red-blue
+            # points are together the points counted
+            for method in ('sweep', 'index'):
+                actual = ""
+                for (_, segmentSet) in testCases.items():
+                    (red, blue) = (segmentSet[0::2], segmentSet[1::2])
+                    points = {point.snapped() for half in (red, blue)
+                              for (point, _, _) in LineSweep(half).iterIntersections()}
+                    points.update(point.snapped()
+                                  for (point, _, _) in RedBlueSweep(red, blue, method=method).iterIntersections())
+                    actual += "{0}\n".format(len(points))
+
+                if actual == expected:
+                    print("{0} passed! (red-blue {1})".format(filename, method))
+                else:
+                    print("{0} failed! (red-blue {1})".format(filename, method))
+
+            # the estimate with no error allowed, which sweeps all the slabs and is then the exact count
+            actual = ""
+            for (_, segmentSet) in testCases.items():
+                approximation = ApproximateCount(segmentSet, relativeError=0).run()
+                actual += "{0}\n".format(approximation.getResult() if approximation.isExact() else None)
+
+            if actual == expected:
+                print("{0} passed! (approximate)".format(filename))
+            else:
+                print("{0} failed! (approximate)".format(filename))
+
+            # a snapshot written midway through every sweep, resumed by a new sweep over the same segments
+            snapshotDir = os.path.join(tempfile.mkdtemp(prefix='test'), 'sweep.snap')
+            actual = ""
+            for (_, segmentSet) in testCases.items():
+                sweep = LineSweep(segmentSet)
+                for _ in sweep.sweep():
+                    if eventsDone(sweep) >= len(segmentSet):
+                        break
+                writeSnapshot(sweep, snapshotDir)
+                actual += "{0}\n".format(runWithCheckpoints(LineSweep(segmentSet), snapshotDir).getResult())
+            os.rmdir(os.path.dirname(snapshotDir))
+
+            if actual == expected:
+                print("{0} passed! (checkpoint)".format(filename))
+            else:
+                print("{0} failed! (checkpoint)".format(filename))
+
+            # the out-of-core sweep with tiny runs and heap, so that runs are merged and events spilled
+            workDir = tempfile.mkdtemp(prefix='test')
+            actual = "".join("{0}\n".format(ExternalSweep(coordinates, workDir=workDir, runSize=8,
+                                                           maxPendingEvents=4, maxFanIn=2).run().getResult())
+                             for (_, coordinates) in Parser(filename).iterCoordinateBlocks())
+            leftover = os.listdir(workDir)
+            shutil.rmtree(workDir)
+
+            if actual == expected and not leftover:
+                print("{0} passed! (external)".format(filename))
+            else:
+                print("{0} failed! (external)".format(filename))
+
+            # the test cases counted in a pool of processes, from their coordinate blocks
+            actual = "".join("{0}\n".format(result)
+                             for (_, result) in countInParallel(Parser(filename).iterCoordinateBlocks(), 2))
+
+            if actual == expected:
+                print("{0} passed! (parallel)".format(filename))
+            else:
+                print("{0} failed! (parallel)".format(filename))
 
         else:
             continue
+
+    # the slab totals against a single sweep, on segments meeting at and near the same points
+    for (name, segments) in (("star", starSegments(200)), ("grid", gridSegments(300))):
+        coordinates = array('d')
+        for seg in segments:
+            coordinates.extend((seg.startPoint.x, seg.startPoint.y, seg.endPoint.x, seg.endPoint.y))
+        expected = LineSweep(segments).run().getResult()
+
+        if all(countBySlabs(coordinates, numOfSlabs, 2) == expected for numOfSlabs in (2, 5, 9)):
+            print("{0} workload passed! (slabs)".format(name))
+        else:
+            print("{0} workload failed! (slabs)".format(name))
+
+    # a sparse input crossed by one long diagonal, which passes through few cells of the prefilter grid
+    segments = sparseSegments(2000) + [Segment(Point(0.0, 0.0), Point(1e5, 1e5))]
+    if countIntersections(segments, prefilter=True) == LineSweep(segments).run().getResult():
+        print("long diagonal passed! (prefilter)")
+    else:
+        print("long diagonal failed! (prefilter)")
+
+    # the engines at precisions other than the default one, on segments meeting at and near the same points
+    for precision in (9, 11):
+        for (name, segments) in (("star", starSegments(200)), ("near-parallel", nearParallelSegments(200)),
+                                 ("grid", gridSegments(200))):
+            counts = {engine(segments, precision).run().getResult() for engine in engines}
+
+            if len(counts) == 1:
+                print("{0} workload passed! (precision {1})".format(name, precision))
+            else:
+                print("{0} workload failed! (precision {1})".format(name, precision))
+
+    try:
+        LineSweep(starSegments(10), 4)
+        print("precision 4 failed! (out of range)")
+    except ValueError:
+        print("precision 4 passed! (out of range)")
+
+    # segments built from NumPy scalars, on a line given in decimals, so their orientations are decided in
+    # exact arithmetic (see GeometricAux.orient2dExact): they meet at (0.2, 0.2) and (0.3, 0.3)
+    if np is not None:
+        rows = ((0.1, 0.1, 0.3, 0.3), (0.2, 0.2, 0.4, 0.4), (0.1, 0.3, 0.3, 0.1), (0.3, 0.3, 0.7, 0.7))
+        for engine in engines:
+            segments = [Segment(Point(np.float64(x1), np.float64(y1)), Point(np.float64(x2), np.float64(y2)))
+                        for (x1, y1, x2, y2) in rows]
+
+            if engine(segments).run().getResult() == 2:
+                print("numpy scalars passed! ({0})".format(engine.__name__))
+            else:
+                print("numpy scalars failed! ({0})".format(engine.__name__))